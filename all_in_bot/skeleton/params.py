@@ -0,0 +1,36 @@
+'''
+Tunable parameters for a pokerbot.
+
+A bot declares its parameters and their defaults with load_params. The defaults can be replaced
+by a params.json file in the bot's directory, which is how tuner.py injects the parameters of
+each variant, or by a JSON object in the B4G_PARAMS environment variable.
+'''
+import json
+import os
+
+PARAMS_FILENAME = 'params.json'
+PARAMS_VARIABLE = 'B4G_PARAMS'
+
+
+def load_params(defaults):
+    '''
+    Returns the bot's parameters: the defaults, updated from params.json and then B4G_PARAMS.
+
+    Arguments:
+    defaults: dict of every parameter name and its default value.
+
+    Returns:
+    dict: The parameter values. Raises KeyError for a parameter the bot does not declare.
+    '''
+    params = dict(defaults)
+    overrides = {}
+    if os.path.exists(PARAMS_FILENAME):
+        with open(PARAMS_FILENAME, 'r') as params_file:
+            overrides.update(json.load(params_file))
+    if os.environ.get(PARAMS_VARIABLE):
+        overrides.update(json.loads(os.environ[PARAMS_VARIABLE]))
+    for name, value in overrides.items():
+        if name not in params:
+            raise KeyError('unknown parameter ' + name)
+        params[name] = value
+    return params
@@ -2,12 +2,14 @@
 Encapsulates game and round state information for the player.
 '''
 from collections import namedtuple
+from functools import cached_property
 from .actions import FoldAction, CallAction, CheckAction, RaiseAction
+from .cards import eval7_cards
 
 GameState = namedtuple('GameState', ['bankroll', 'game_clock', 'round_num'])
 TerminalState = namedtuple('TerminalState', ['deltas', 'previous_state'])
 
-NUM_ROUNDS = 1000
+NUM_ROUNDS = 5000
 STARTING_STACK = 500
 BIG_BLIND = 10
 SMALL_BLIND = 5
@@ -18,6 +20,20 @@ class RoundState(namedtuple('_RoundState', ['button', 'street', 'pips', 'stacks'
     Encodes the game tree for one round of poker.
     '''
 
+    @cached_property
+    def eval7_hands(self):
+        '''
+        The shared eval7.Cards of both hands.
+        '''
+        return [eval7_cards(hand) for hand in self.hands]
+
+    @cached_property
+    def eval7_board(self):
+        '''
+        The shared eval7.Cards of the board.
+        '''
+        return eval7_cards(self.deck)
+
     def showdown(self):
         '''
         Compares the players' hands and computes payoffs.
@@ -0,0 +1,209 @@
+'''
+Single-elimination bracket runner, matching the format of the final Build4Good event.
+
+Bots are seeded in the order given on the command line (the first is seed 1). Matches run in
+parallel across a process pool, and a winner moves on as soon as its match is decided, so later
+rounds start while slower matches of the same round are still being played.
+
+Example:
+    python bracket.py ./luckson ./equity ./test_bot ./all_in_bot --best-of 3 --rounds 1000
+'''
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import argparse
+import json
+import os
+import random
+
+import engine
+
+
+def seed_order(size):
+    '''
+    Returns the seeds of a bracket of the given power-of-two size in slot order, so that seed 1
+    meets seed size in the first round and the top two seeds can only meet in the final.
+    '''
+    order = [1]
+    while len(order) < size:
+        order = [seed for top in order for seed in (top, 2 * len(order) + 1 - top)]
+    return order
+
+
+def unique_names(paths):
+    '''
+    Names each bot after its directory, adding the seed when two directories share a name.
+    '''
+    names = [os.path.basename(os.path.normpath(path)) for path in paths]
+    return [name if names.count(name) == 1 else '{}-{}'.format(name, seed)
+            for seed, name in enumerate(names, 1)]
+
+
+class Series():
+    '''
+    A best-of-N series between two seeds. Tied matches do not count towards either side.
+    '''
+
+    def __init__(self, round_index, slot, seeds, best_of):
+        self.round_index = round_index
+        self.slot = slot
+        self.seeds = seeds
+        self.best_of = best_of
+        self.wins = [0, 0]
+        self.chips = 0
+        self.games_started = 0
+        self.games_finished = 0
+        self.winner = None
+
+    def games_wanted(self):
+        '''
+        Returns how many more games to start so that the series could end once they finish.
+        '''
+        in_flight = self.games_started - self.games_finished
+        needed = self.best_of // 2 + 1 - max(self.wins)
+        return max(0, min(needed, 2 * self.best_of - self.games_started) - in_flight)
+
+    def record(self, result, swapped):
+        '''
+        Adds one finished match to the series and decides it if possible.
+        '''
+        self.games_finished += 1
+        bankrolls = result.bankrolls[::-1] if swapped else result.bankrolls
+        self.chips += bankrolls[0]
+        if bankrolls[0] != bankrolls[1]:
+            self.wins[0 if bankrolls[0] > bankrolls[1] else 1] += 1
+        if max(self.wins) > self.best_of // 2:
+            self.winner = self.seeds[self.wins.index(max(self.wins))]
+        elif self.games_finished == 2 * self.best_of:
+            # too many tied matches, the higher seed advances
+            self.winner = min(self.seeds)
+
+
+class Bracket():
+    '''
+    Schedules the series of a single-elimination bracket onto a process pool.
+    '''
+
+    def __init__(self, paths, best_of=1, seed=None, log_directory='bracket_logs', overrides=None):
+        self.paths = [os.path.abspath(path) for path in paths]
+        self.names = unique_names(paths)
+        self.best_of = best_of
+        self.seed = seed if seed is not None else random.randrange(2**32)
+        self.log_directory = log_directory
+        self.overrides = overrides or {}
+        size = 1
+        while size < len(paths):
+            size *= 2
+        self.num_rounds = size.bit_length() - 1
+        # slots[r] lists the entrants of round r in bracket order, None while undecided and 0 for a bye
+        self.slots = [[None] * (size >> r) for r in range(self.num_rounds + 1)]
+        self.slots[0] = [entrant if entrant <= len(paths) else 0 for entrant in seed_order(size)]
+        self.results = []
+
+    def game_spec(self, series, game):
+        '''
+        Returns the play_match arguments for one game of a series, alternating seats.
+        '''
+        swapped = game % 2 == 1
+        seeds = series.seeds[::-1] if swapped else series.seeds
+        players = [(self.names[seed - 1], self.paths[seed - 1]) for seed in seeds]
+        match_id = 'r{}-m{}-g{}'.format(series.round_index + 1, series.slot + 1, game + 1)
+        log_filename = os.path.join(self.log_directory, match_id, 'gamelog')
+        overrides = dict(self.overrides)
+        overrides['MATCH_SEED'] = random.Random('{}-{}'.format(self.seed, match_id)).randrange(2**32)
+        return players, log_filename, overrides, swapped
+
+    def advance(self, round_index, slot, seed):
+        '''
+        Places the winner of series number slot in the next round. Returns the next series if
+        both of its entrants are known.
+        '''
+        self.slots[round_index + 1][slot] = seed
+        if round_index + 1 == self.num_rounds:
+            return None
+        pair = self.slots[round_index + 1][slot // 2 * 2:slot // 2 * 2 + 2]
+        if None in pair:
+            return None
+        return self.start_series(round_index + 1, slot // 2, pair)
+
+    def start_series(self, round_index, slot, pair):
+        '''
+        Returns a Series for two entrants, or advances the lone entrant past a bye.
+        '''
+        if 0 in pair:
+            return self.advance(round_index, slot, max(pair))
+        return Series(round_index, slot, list(pair), self.best_of)
+
+    def run(self, workers=None):
+        '''
+        Plays the bracket and returns the champion's seed.
+        '''
+        ready = []
+        for slot in range(0, len(self.slots[0]), 2):
+            series = self.start_series(0, slot // 2, self.slots[0][slot:slot + 2])
+            if series is not None:
+                ready.append(series)
+        if self.num_rounds == 0:
+            return self.slots[0][0]
+        pending = {}
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            while ready or pending:
+                for series in ready:
+                    for _ in range(series.games_wanted()):
+                        players, log_filename, overrides, swapped = self.game_spec(series, series.games_started)
+                        future = executor.submit(engine.play_match, players[0], players[1], log_filename, overrides)
+                        pending[future] = (series, swapped)
+                        series.games_started += 1
+                ready = []
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    series, swapped = pending.pop(future)
+                    if series.winner is not None:
+                        continue  # a surplus game of an already decided series
+                    series.record(future.result(), swapped)
+                    if series.winner is None:
+                        ready.append(series)
+                        continue
+                    self.report(series)
+                    following = self.advance(series.round_index, series.slot, series.winner)
+                    if following is not None:
+                        ready.append(following)
+        champion = self.slots[-1][0]
+        print('Champion:', self.names[champion - 1], '(seed {})'.format(champion))
+        with open(os.path.join(self.log_directory, 'bracket.json'), 'w') as results_file:
+            json.dump({'seed': self.seed, 'champion': self.names[champion - 1], 'series': self.results},
+                      results_file, indent=2)
+        return champion
+
+    def report(self, series):
+        '''
+        Prints and records a decided series.
+        '''
+        names = [self.names[seed - 1] for seed in series.seeds]
+        winner = self.names[series.winner - 1]
+        print('Round {} of {}: {} (seed {}) vs {} (seed {}) - {} advances, {}-{} in matches, {:+d} chips'.format(
+            series.round_index + 1, self.num_rounds, names[0], series.seeds[0], names[1], series.seeds[1],
+            winner, series.wins[0], series.wins[1], series.chips))
+        self.results.append({'round': series.round_index + 1, 'players': names, 'wins': series.wins,
+                             'chips': series.chips, 'winner': winner})
+
+
+def parse_args():
+    '''
+    Parses the bracket's command line.
+    '''
+    parser = argparse.ArgumentParser(prog='python bracket.py')
+    parser.add_argument('paths', nargs='+', help='Bot directories in seed order, best first')
+    parser.add_argument('--best-of', type=int, default=1, help='Matches per series, defaults to 1')
+    parser.add_argument('--rounds', type=int, default=None, help='Rounds per match, defaults to NUM_ROUNDS')
+    parser.add_argument('--workers', type=int, default=None, help='Parallel matches, defaults to the CPU count')
+    parser.add_argument('--seed', type=int, default=None, help='Bracket seed that fixes every match seed')
+    parser.add_argument('--log-dir', type=str, default='bracket_logs', help='Where to write the match logs')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    # a decided match cannot change who advances, and zygotes pay off over many matches
+    overrides = {'EARLY_TERMINATION': True, 'USE_ZYGOTES': True}
+    if args.rounds is not None:
+        overrides['NUM_ROUNDS'] = args.rounds
+    Bracket(args.paths, args.best_of, args.seed, args.log_dir, overrides).run(args.workers)
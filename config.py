@@ -13,7 +13,29 @@ PLAYER_LOG_SIZE_LIMIT = 524288
 ENFORCE_GAME_CLOCK = True
 STARTING_GAME_CLOCK = 180.0
 BUILD_TIMEOUT = 30.0
+# BUILDS ARE SKIPPED WHILE A BOT'S FILES MATCH THE STAMP IN THIS DIRECTORY, None ALWAYS REBUILDS
+BUILD_CACHE_DIRECTORY = '.build_cache'
 CONNECT_TIMEOUT = 30.0
+# BOT_MEMORY_LIMIT CAPS EACH BOT'S ADDRESS SPACE IN BYTES, None DISABLES THE CAP
+BOT_MEMORY_LIMIT = None
+# MEMORY GROWTH IS FITTED OVER THE ROUNDS AFTER THE FIRST MEMORY_WARMUP_ROUNDS, WHILE BOTS STILL BUILD LAZY TABLES AND CACHES
+MEMORY_WARMUP_ROUNDS = 100
+# FORK PYTHON BOTS FROM A ZYGOTE THAT KEEPS player.py IMPORTED ACROSS MATCHES IN ONE PROCESS
+USE_ZYGOTES = False
+# MATCH_SEED FIXES THE CARDS DEALT IN EVERY ROUND, None PICKS A RANDOM SEED
+MATCH_SEED = None
+# WITH A FIXED MATCH_SEED, REUSE RESULTS OF IDENTICAL MATCHES STORED HERE, None DISABLES THE CACHE
+MATCH_CACHE_DIRECTORY = None
+# SPLIT THE ROUNDS ACROSS THIS MANY PARALLEL PAIRS OF BOTS IF BOTH DECLARE "stateless" IN commands.json
+NUM_SHARDS = 1
+# SAVE A CHECKPOINT EVERY CHECKPOINT_INTERVAL ROUNDS FOR `python engine.py --resume`, 0 DISABLES CHECKPOINTS
+CHECKPOINT_INTERVAL = 500
+# END THE MATCH ONCE THE LEADER CAN FOLD EVERY REMAINING ROUND AND STILL WIN. THE REMAINING ROUNDS ARE
+# SETTLED AS IF THE LEADER FOLDED EACH ONE, A WORST CASE FOR THE LEADER RATHER THAN A PLAYED RESULT; THE
+# LOG AND MatchResult.forfeited_rounds MARK THEM AND stats.py LEAVES THEM OUT
+EARLY_TERMINATION = False
+# DEAL OUT THE REMAINING STREETS WITHOUT QUERYING THE BOTS ONCE A PLAYER IS ALL-IN
+AUTO_RUNOUT = True
 # THE GAME VARIANT FIXES THE PARAMETERS BELOW
 # CHANGE ONLY FOR TRAINING OR EXPERIMENTATION
 NUM_ROUNDS = 5000
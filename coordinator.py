@@ -0,0 +1,285 @@
+'''
+Distributes matches to worker processes on other machines over TCP.
+
+The coordinator hands out one match job at a time to each connected worker. A worker plays the
+match with engine.play_match and sends back the MatchResult together with the zlib-compressed
+game log. While a match is running the worker sends a heartbeat every HEARTBEAT_INTERVAL
+seconds; if the coordinator hears nothing for HEARTBEAT_TIMEOUT seconds, or the connection
+drops, the job goes back to the front of the queue for another worker. So does a job whose match
+raised an error on the worker, which sends the error back instead of a result. A job that fails
+MAX_ATTEMPTS times in either way fails its Future with the last error.
+
+Bot paths in jobs are resolved on the worker, so every node needs the bots at the same paths.
+
+Messages are JSON objects, one per line:
+    coordinator -> worker: {"type": "job", "id", "player_1", "player_2", "seed", "overrides"}
+    worker -> coordinator: {"type": "heartbeat"}
+                           {"type": "result", "id", "result", "log"}
+                           {"type": "error", "id", "error"}
+
+Example on one machine:
+    python coordinator.py serve jobs.json --port 6000
+    python coordinator.py work --port 6000   (in as many other shells as you like)
+where jobs.json lists objects like
+    {"player_1": ["luckson", "./luckson"], "player_2": ["equity", "./equity"], "overrides": {"NUM_ROUNDS": 1000}}
+'''
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+import argparse
+import base64
+import json
+import os
+import socket
+import socketserver
+import tempfile
+import threading
+import traceback
+import zlib
+
+import engine
+
+HEARTBEAT_INTERVAL = 5.0
+HEARTBEAT_TIMEOUT = 30.0
+# attempts at a job, counting errors and lost workers, before its Future fails
+MAX_ATTEMPTS = 3
+
+
+def send_message(socketfile, message):
+    '''
+    Writes one JSON message followed by a newline.
+    '''
+    socketfile.write(json.dumps(message) + '\n')
+    socketfile.flush()
+
+
+def receive_message(socketfile):
+    '''
+    Reads one JSON message. Raises ConnectionError if the other side hung up.
+    '''
+    line = socketfile.readline()
+    if not line:
+        raise ConnectionError('connection closed')
+    return json.loads(line)
+
+
+class WorkerHandler(socketserver.StreamRequestHandler):
+    '''
+    Feeds jobs to one connected worker until it disconnects or stops sending heartbeats.
+    '''
+
+    def handle(self):
+        coordinator = self.server.coordinator
+        socketfile = self.request.makefile('rw')
+        worker = '{}:{}'.format(*self.client_address)
+        print('Worker', worker, 'connected')
+        while True:
+            job_id = coordinator.next_job()
+            if job_id is None:
+                return
+            job = coordinator.jobs[job_id]
+            try:
+                send_message(socketfile, dict(job['spec'], type='job', id=job_id))
+                self.request.settimeout(HEARTBEAT_TIMEOUT)
+                while True:
+                    message = receive_message(socketfile)
+                    if message['type'] in ('result', 'error'):
+                        break
+                self.request.settimeout(None)
+            except (OSError, ValueError, KeyError):
+                print('Worker', worker, 'lost during job', job_id)
+                coordinator.retry(job_id, 'worker {} lost'.format(worker))
+                return
+            if message['type'] == 'error':
+                print('Job', job_id, 'failed on worker', worker)
+                coordinator.retry(job_id, message['error'])
+            else:
+                coordinator.complete(job_id, message)
+
+
+class Coordinator():
+    '''
+    Queues match jobs and serves them to workers. submit() returns a Future for the result,
+    so the coordinator can stand in for a local process pool.
+    '''
+
+    def __init__(self, host='', port=0, log_directory='coordinator_logs'):
+        self.log_directory = log_directory
+        self.jobs = {}
+        self.queue = deque()
+        self.condition = threading.Condition()
+        self.closed = False
+        self.server = socketserver.ThreadingTCPServer((host, port), WorkerHandler)
+        self.server.daemon_threads = True
+        self.server.coordinator = self
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def submit(self, player_1, player_2, seed=None, overrides=None):
+        '''
+        Queues one match and returns a Future for its MatchResult.
+
+        Args:
+            player_1 (tuple): (name, path) of the first pokerbot.
+            player_2 (tuple): (name, path) of the second pokerbot.
+            seed (int): The match seed, or None to let the worker choose one.
+            overrides (dict): config.py parameters to replace for this match.
+        '''
+        future = Future()
+        with self.condition:
+            job_id = len(self.jobs)
+            spec = {'player_1': list(player_1), 'player_2': list(player_2), 'seed': seed, 'overrides': overrides or {}}
+            self.jobs[job_id] = {'spec': spec, 'future': future, 'attempts': 0}
+            self.queue.append(job_id)
+            self.condition.notify()
+        return future
+
+    def next_job(self):
+        '''
+        Blocks until a job is queued and returns its id, or returns None once the coordinator closes.
+        '''
+        with self.condition:
+            while not self.queue and not self.closed:
+                self.condition.wait()
+            return self.queue.popleft() if self.queue else None
+
+    def retry(self, job_id, error):
+        '''
+        Puts a job whose worker was lost or raised an error back at the front of the queue, or
+        fails its Future with the error after MAX_ATTEMPTS attempts.
+        '''
+        with self.condition:
+            job = self.jobs[job_id]
+            if job['future'].done():
+                return
+            job['attempts'] += 1
+            if job['attempts'] >= MAX_ATTEMPTS:
+                job['future'].set_exception(RuntimeError('job {} failed {} times, last with: {}'.format(
+                    job_id, job['attempts'], error)))
+                return
+            self.queue.appendleft(job_id)
+            self.condition.notify()
+
+    def complete(self, job_id, message):
+        '''
+        Stores a finished job's game log and resolves its Future.
+        '''
+        future = self.jobs[job_id]['future']
+        if future.done():
+            return  # a worker presumed lost finished after its job was handed to another
+        log_directory = os.path.join(self.log_directory, str(job_id))
+        os.makedirs(log_directory, exist_ok=True)
+        with open(os.path.join(log_directory, 'gamelog.txt'), 'wb') as log_file:
+            log_file.write(zlib.decompress(base64.b64decode(message['log'])))
+        future.set_result(engine.MatchResult(**message['result']))
+
+    def close(self):
+        '''
+        Tells idle workers to disconnect and stops accepting new ones.
+        '''
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def play_job(executor, socketfile, job):
+    '''
+    Plays one job in the executor, sending heartbeats until it finishes, and returns its result
+    message.
+    '''
+    overrides = dict(job['overrides'])
+    if job['seed'] is not None:
+        overrides['MATCH_SEED'] = job['seed']
+    with tempfile.TemporaryDirectory() as log_directory:
+        log_filename = os.path.join(log_directory, 'gamelog')
+        future = executor.submit(engine.play_match, tuple(job['player_1']), tuple(job['player_2']),
+                                 log_filename, overrides)
+        while not wait([future], timeout=HEARTBEAT_INTERVAL).done:
+            send_message(socketfile, {'type': 'heartbeat'})
+        result = future.result()
+        with open(log_filename + '.txt', 'rb') as log_file:
+            log = base64.b64encode(zlib.compress(log_file.read())).decode()
+    print('Finished job', job['id'], result.names, result.bankrolls)
+    return {'type': 'result', 'id': job['id'], 'result': result._asdict(), 'log': log}
+
+
+def work(host, port):
+    '''
+    Connects to a coordinator and plays the jobs it hands out until it disconnects. A job that
+    raises is reported back to the coordinator as an error.
+    '''
+    executor = ProcessPoolExecutor(max_workers=1)
+    try:
+        with socket.create_connection((host, port)) as sock:
+            socketfile = sock.makefile('rw')
+            print('Connected to coordinator at {}:{}'.format(host, port))
+            while True:
+                try:
+                    job = receive_message(socketfile)
+                except ConnectionError:
+                    return
+                try:
+                    message = play_job(executor, socketfile, job)
+                except Exception as error:
+                    message = {'type': 'error', 'id': job['id'], 'error': traceback.format_exc()}
+                    print('Job', job['id'], 'failed:', message['error'])
+                    if isinstance(error, BrokenProcessPool):
+                        # the match took the pool's process down with it
+                        executor.shutdown()
+                        executor = ProcessPoolExecutor(max_workers=1)
+                send_message(socketfile, message)
+    finally:
+        executor.shutdown()
+
+
+def serve(jobs_filename, host, port, log_directory):
+    '''
+    Queues the jobs listed in a JSON file, waits for workers to play them all and writes the
+    results next to the game logs, with the error in place of the result of a job that failed.
+    '''
+    with open(jobs_filename, 'r') as jobs_file:
+        specs = json.load(jobs_file)
+    coordinator = Coordinator(host, port, log_directory)
+    print('Coordinator listening on port', coordinator.port, 'with', len(specs), 'jobs')
+    futures = [coordinator.submit(spec['player_1'], spec['player_2'], spec.get('seed'), spec.get('overrides'))
+               for spec in specs]
+    results = []
+    for job_id, future in enumerate(futures):
+        try:
+            result = future.result()
+        except RuntimeError as error:
+            print(error)
+            results.append({'error': str(error)})
+            continue
+        print('Job', job_id, result.names, result.bankrolls)
+        results.append({'names': result.names, 'bankrolls': result.bankrolls, 'seed': result.seed})
+    coordinator.close()
+    with open(os.path.join(log_directory, 'results.json'), 'w') as results_file:
+        json.dump(results, results_file, indent=2)
+
+
+def parse_args():
+    '''
+    Parses the command line of the coordinator and of its workers.
+    '''
+    parser = argparse.ArgumentParser(prog='python coordinator.py')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    serve_parser = subparsers.add_parser('serve', help='Hand out the jobs in a JSON file')
+    serve_parser.add_argument('jobs', type=str, help='JSON list of match jobs')
+    serve_parser.add_argument('--host', type=str, default='', help='Interface to listen on, defaults to all')
+    serve_parser.add_argument('--port', type=int, default=6000, help='Port to listen on, defaults to 6000')
+    serve_parser.add_argument('--log-dir', type=str, default='coordinator_logs', help='Where to write game logs')
+    work_parser = subparsers.add_parser('work', help='Play jobs from a coordinator')
+    work_parser.add_argument('--host', type=str, default='localhost', help='Coordinator host, defaults to localhost')
+    work_parser.add_argument('--port', type=int, default=6000, help='Coordinator port, defaults to 6000')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    if args.command == 'serve':
+        serve(args.jobs, args.host, args.port, args.log_dir)
+    else:
+        work(args.host, args.port)
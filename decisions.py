@@ -0,0 +1,340 @@
+'''
+Decision corpus extraction and batch evaluation of bot versions.
+
+`extract` parses archived game logs into a corpus of rounds, stored as gzipped JSON lines. Every
+action a bot chose in those rounds is a decision point. `evaluate` replays the corpus into the
+RoundState each bot would have seen at those points and calls the bot's get_action on it directly,
+in-process on a process pool, without an engine or sockets. The replay always follows the logged
+actions, so every bot version answers the same spots.
+
+Example:
+    python decisions.py extract gamelog.txt league_logs/*/gamelog.txt -o corpus.jsonl.gz
+    python decisions.py evaluate corpus.jsonl.gz ./luckson ./equity --workers 4
+'''
+from collections import Counter, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import gzip
+import json
+import os
+import random
+import re
+import statistics
+import sys
+import time
+
+import engine
+
+ROUND_HEADER = re.compile(r'Round #(\d+), (.+) \((-?\d+)\), (.+) \((-?\d+)\)$')
+BOARD_LINE = re.compile(r'(?:Flop|Turn) \[([^\]]*)\]')
+STACKS_LINE = re.compile(r'Current stacks: (-?\d+), (-?\d+)$')
+STREET_NAMES = {0: 'preflop', 2: 'flop', 4: 'turn'}
+ACTION_TYPES = 'FCKR'
+
+Evaluation = namedtuple('Evaluation', ['name', 'streets', 'logged', 'codes', 'seconds'])
+
+
+def parse_log(log_file):
+    '''
+    Yields one corpus record per round of a game log.
+
+    A record holds the seat-ordered names, bankrolls before the round, hole cards, the board dealt
+    so far and the actions as (seat, code) pairs, with the engine's codes F, C, K and R###.
+    Checks the engine made on a bot's behalf after betting closed have seat None.
+    '''
+    record = None
+    auto_checks = False
+    for line in log_file:
+        line = line.rstrip('\n')
+        header = ROUND_HEADER.match(line)
+        if header is not None:
+            if record is not None:
+                yield record
+            record = {'round': int(header.group(1)), 'names': [header.group(2), header.group(4)],
+                      'bankrolls': [int(header.group(3)), int(header.group(5))],
+                      'hands': [[], []], 'board': [], 'actions': [], 'deltas': [0, 0], 'showdown': False}
+            auto_checks = False
+            continue
+        if record is None:
+            continue
+        if not line:
+            yield record
+            record = None
+            continue
+        board = BOARD_LINE.match(line)
+        if board is not None:
+            record['board'] = board.group(1).split()
+            continue
+        stacks = STACKS_LINE.match(line)
+        if stacks is not None:
+            auto_checks = '0' in stacks.groups()
+            continue
+        for seat, name in enumerate(record['names']):
+            if not line.startswith(name + ' '):
+                continue
+            words = line[len(name) + 1:]
+            if words.startswith('dealt ['):
+                record['hands'][seat] = words[7:-1].split()
+            elif words == 'folds':
+                record['actions'].append((seat, 'F'))
+            elif words == 'calls':
+                record['actions'].append((seat, 'C'))
+            elif words == 'checks':
+                record['actions'].append((None if auto_checks else seat, 'K'))
+            elif words.startswith('bets ') or words.startswith('raises to '):
+                record['actions'].append((seat, 'R' + words.split()[-1]))
+            elif words.startswith('shows '):
+                record['showdown'] = True
+            elif words.startswith('awarded '):
+                record['deltas'][seat] = int(words.split()[-1])
+            break
+    if record is not None:
+        yield record
+
+
+def extract(log_filenames, corpus_filename):
+    '''
+    Writes the rounds of the given game logs to a corpus file and returns the number of decisions.
+    '''
+    num_decisions = 0
+    with gzip.open(corpus_filename, 'wt') as corpus_file:
+        for log_filename in log_filenames:
+            with open(log_filename, 'r') as log_file:
+                for record in parse_log(log_file):
+                    if not record['actions']:
+                        continue  # a forfeit summary, or a round cut off by a crash
+                    corpus_file.write(json.dumps(record, separators=(',', ':')) + '\n')
+                    num_decisions += sum(seat is not None for seat, _ in record['actions'])
+    return num_decisions
+
+
+def load_corpus(corpus_filename, name=None, limit=None):
+    '''
+    Returns (record, seat) pairs for the rounds of a corpus, one per seat with decisions. If name
+    is given only the decisions of that bot are kept. limit caps the number of decisions.
+    '''
+    units = []
+    num_decisions = 0
+    with gzip.open(corpus_filename, 'rt') as corpus_file:
+        for line in corpus_file:
+            record = json.loads(line)
+            for seat in (0, 1):
+                if name is not None and record['names'][seat] != name:
+                    continue
+                count = sum(actor == seat for actor, _ in record['actions'])
+                if count == 0:
+                    continue
+                units.append((record, seat))
+                num_decisions += count
+                if limit is not None and num_decisions >= limit:
+                    return units
+    return units
+
+
+BOT = None
+
+
+def import_bot(path):
+    '''
+    Imports a bot directory's player.py and skeleton into this process, which then runs in that
+    directory. Only one bot can be imported per process.
+
+    Returns:
+        tuple: The player, skeleton.actions and skeleton.states modules.
+    '''
+    path = os.path.abspath(path)
+    os.chdir(path)
+    sys.path.insert(0, path)
+    import player
+    from skeleton import actions, states
+    return player, actions, states
+
+
+def load_bot(path):
+    '''
+    Process pool initializer: imports a bot and creates the Player that answers this process's spots.
+    '''
+    global BOT
+    player, actions, states = import_bot(path)
+    BOT = (player.Player(), actions, states)
+
+
+def encode_action(action, actions):
+    '''
+    Returns the engine code of an action returned by get_action.
+    '''
+    if isinstance(action, actions.FoldAction):
+        return 'F'
+    if isinstance(action, actions.CallAction):
+        return 'C'
+    if isinstance(action, actions.CheckAction):
+        return 'K'
+    if isinstance(action, actions.RaiseAction):
+        return 'R' + str(action.amount)
+    return '?'
+
+
+def decode_action(code, actions):
+    '''
+    Returns the skeleton action for an engine code.
+    '''
+    if code == 'F':
+        return actions.FoldAction()
+    if code == 'C':
+        return actions.CallAction()
+    if code == 'K':
+        return actions.CheckAction()
+    return actions.RaiseAction(int(code[1:]))
+
+
+def replay_round(unit, game_clock):
+    '''
+    Replays one round from one seat's point of view, asking the loaded bot for an action wherever
+    that seat acted in the log. Returns (street, logged code, bot's code, seconds) per decision,
+    with the bot's code X if get_action raised.
+    '''
+    (record, seat), index = unit
+    pokerbot, actions, states = BOT
+    random.seed(index)
+    game_state = states.GameState(record['bankrolls'][seat], game_clock, record['round'])
+    hands = [[], []]
+    hands[seat] = record['hands'][seat]
+    round_state = states.RoundState(0, 0, [states.SMALL_BLIND, states.BIG_BLIND],
+                                    [states.STARTING_STACK - states.SMALL_BLIND,
+                                     states.STARTING_STACK - states.BIG_BLIND], hands, [], None)
+    pokerbot.handle_new_round(game_state, round_state, seat)
+    answers = []
+    for actor, code in record['actions']:
+        if actor == seat:
+            start_time = time.perf_counter()
+            try:
+                answer = encode_action(pokerbot.get_action(game_state, round_state, seat), actions)
+            except Exception:
+                answer = 'X'
+            answers.append((round_state.street, code, answer, time.perf_counter() - start_time))
+        street = round_state.street
+        round_state = round_state.proceed(decode_action(code, actions))
+        if isinstance(round_state, states.TerminalState):
+            break
+        if round_state.street != street:
+            round_state = states.RoundState(round_state.button, round_state.street, round_state.pips,
+                                            round_state.stacks, hands, record['board'][:round_state.street],
+                                            round_state.previous_state)
+    if isinstance(round_state, states.TerminalState):
+        if record['showdown']:
+            hands[1-seat] = record['hands'][1-seat]
+        game_state = states.GameState(game_state.bankroll + record['deltas'][seat], game_clock, record['round'])
+        try:
+            pokerbot.handle_round_over(game_state, states.TerminalState(record['deltas'], round_state.previous_state),
+                                       seat)
+        except Exception:
+            pass
+    return answers
+
+
+def evaluate(units, path, workers=None, game_clock=engine.STARTING_GAME_CLOCK):
+    '''
+    Asks one bot for its action at every decision of the given corpus units.
+
+    Returns:
+        Evaluation: The bot's name, then per decision the street, the logged action code, the
+        bot's action code and the seconds its get_action call took. The lists are empty if the
+        units hold no decisions.
+    '''
+    path = os.path.abspath(path)
+    name = os.path.basename(os.path.normpath(path))
+    if not units:
+        return Evaluation(name, [], [], [], [])
+    workers = workers or os.cpu_count()
+    chunksize = max(1, len(units) // (workers * 8))
+    with ProcessPoolExecutor(max_workers=workers, initializer=load_bot, initargs=(path,)) as executor:
+        answers = executor.map(replay_round, zip(units, range(len(units))), [game_clock] * len(units),
+                               chunksize=chunksize)
+        answers = [answer for round_answers in answers for answer in round_answers]
+    if not answers:
+        return Evaluation(name, [], [], [], [])
+    return Evaluation(name, *map(list, zip(*answers)))
+
+
+def agreement(first, second, streets):
+    '''
+    Returns the fractions of decisions where two lists of codes match exactly and by action type,
+    overall and per street.
+    '''
+    rows = {}
+    for street in [None] + sorted(STREET_NAMES):
+        pairs = [(a, b) for a, b, s in zip(first, second, streets) if street is None or s == street]
+        if pairs:
+            rows[street] = (len(pairs), sum(a == b for a, b in pairs) / len(pairs),
+                            sum(a[0] == b[0] for a, b in pairs) / len(pairs))
+    return rows
+
+
+def report(evaluations, examples=0):
+    '''
+    Prints timings for each evaluated bot and how the later bots' decisions differ from the first's.
+    '''
+    print('{:<20} {:>9} {:>6} {:>8} {:>8} {:>8} {:>8} {:>8}'.format(
+        'Bot', 'Decisions', 'Errors', 'Mean ms', 'p50 ms', 'p99 ms', 'Max ms', 'Total s'))
+    for evaluation in evaluations:
+        times = sorted(seconds * 1000 for seconds in evaluation.seconds)
+        if not times:
+            print('{:<20} {:>9} {:>6}'.format(evaluation.name, 0, 0))
+            continue
+        print('{:<20} {:>9} {:>6} {:>8.3f} {:>8.3f} {:>8.3f} {:>8.3f} {:>8.2f}'.format(
+            evaluation.name, len(times), evaluation.codes.count('X'), statistics.mean(times),
+            times[len(times) // 2], times[min(len(times) - 1, len(times) * 99 // 100)], times[-1], sum(times) / 1000))
+    base = evaluations[0]
+    comparisons = [('logged', base.logged)] + [(evaluation.name, evaluation.codes) for evaluation in evaluations[1:]]
+    for name, codes in comparisons:
+        print()
+        print('{} vs {}: same action / same action type'.format(base.name, name))
+        for street, (count, exact, typed) in agreement(base.codes, codes, base.streets).items():
+            print('  {:<8} {:>9} decisions {:7.2%} {:7.2%}'.format(
+                STREET_NAMES.get(street, 'all'), count, exact, typed))
+        confusion = Counter((a[0], b[0]) for a, b in zip(base.codes, codes))
+        print('  action types, rows {}, columns {}'.format(base.name, name))
+        print('  {:<8} '.format('') + ''.join('{:>9}'.format(column) for column in ACTION_TYPES + 'X'))
+        for row in ACTION_TYPES + 'X':
+            if any(confusion[row, column] for column in ACTION_TYPES + 'X'):
+                print('  {:<8} '.format(row) + ''.join('{:>9}'.format(confusion[row, column])
+                                                       for column in ACTION_TYPES + 'X'))
+        if examples:
+            differences = [i for i, (a, b) in enumerate(zip(base.codes, codes)) if a != b]
+            for i in differences[:examples]:
+                print('  decision {}: {} {} vs {} {}'.format(i, base.name, base.codes[i], name, codes[i]))
+
+
+def parse_args():
+    '''
+    Parses the command line of the corpus extractor and the batch evaluator.
+    '''
+    parser = argparse.ArgumentParser(prog='python decisions.py')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    extract_parser = subparsers.add_parser('extract', help='Build a decision corpus from game logs')
+    extract_parser.add_argument('logs', nargs='+', help='Game logs to read')
+    extract_parser.add_argument('-o', '--output', type=str, default='corpus.jsonl.gz', help='Corpus file to write')
+    evaluate_parser = subparsers.add_parser('evaluate', help='Ask bots for their actions on a corpus')
+    evaluate_parser.add_argument('corpus', type=str, help='Corpus file written by extract')
+    evaluate_parser.add_argument('paths', nargs='+', help='Bot directories, later ones are compared to the first')
+    evaluate_parser.add_argument('--name', type=str, default=None, help='Only use the decisions of this player')
+    evaluate_parser.add_argument('--limit', type=int, default=None, help='Stop after this many decisions')
+    evaluate_parser.add_argument('--workers', type=int, default=None, help='Processes per bot, defaults to the CPU count')
+    evaluate_parser.add_argument('--examples', type=int, default=0, help='Differing decisions to print')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    if args.command == 'extract':
+        print('Wrote', extract(args.logs, args.output), 'decisions to', args.output)
+    else:
+        units = load_corpus(args.corpus, args.name, args.limit)
+        if not units:
+            print('No decisions in', args.corpus + ('' if args.name is None else ' by ' + args.name))
+        evaluations = []
+        for path in args.paths:
+            start_time = time.perf_counter()
+            evaluations.append(evaluate(units, path, args.workers))
+            print('Evaluated {} in {:.2f} s'.format(path, time.perf_counter() - start_time))
+        report(evaluations, args.examples)
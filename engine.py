@@ -3,6 +3,7 @@
 DO NOT REMOVE, RENAME, OR EDIT THIS FILE
 '''
 from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
 from threading import Thread
 from queue import Queue
 import time
@@ -13,10 +14,23 @@ import socket
 import eval7
 import sys
 import os
+import io
 import random
+import hashlib
+import contextlib
+import gzip
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
 
 sys.path.append(os.getcwd())
 from config import *
+from zygote import Zygote, forkable
 
 FoldAction = namedtuple('FoldAction', [])
 CallAction = namedtuple('CallAction', [])
@@ -24,6 +38,9 @@ CheckAction = namedtuple('CheckAction', [])
 # we coalesce BetAction and RaiseAction for convenience
 RaiseAction = namedtuple('RaiseAction', ['amount'])
 TerminalState = namedtuple('TerminalState', ['deltas', 'previous_state'])
+# bankrolls and per-round deltas are listed in [player 1, player 2] order; the last forfeited_rounds
+# deltas were settled by EARLY_TERMINATION rather than played
+MatchResult = namedtuple('MatchResult', ['names', 'bankrolls', 'deltas', 'seed', 'forfeited_rounds'], defaults=(0,))
 
 STREET_NAMES = ['Flop', 'Turn']
 DECODE = {'F': FoldAction, 'C': CallAction, 'K': CheckAction, 'R': RaiseAction}
@@ -31,11 +48,14 @@ CCARDS = lambda cards: ','.join(map(str, cards))
 PCARDS = lambda cards: '[{}]'.format(' '.join(map(str, cards)))
 PVALUE = lambda name, value: ', {} ({})'.format(name, value)
 STATUS = lambda players: ''.join([PVALUE(p.name, p.bankroll) for p in players])
+MEMORY = lambda name, peak, growth: '{} peak memory {:.1f} MB, growth {:+.2f} MB per 1000 rounds'.format(
+    name, peak / 2**20, growth / 2**20)
 
 # Socket encoding scheme:
 #
 # T#.### the player's game clock
 # P# the- player's index
+# S### a seed for the player's random number generators this round
 # H**,** the player's hand in common format
 # F a fold action in the round history
 # C a call action in the round history
@@ -143,6 +163,12 @@ class RoundState(namedtuple('_RoundState', ['button', 'street', 'pips', 'stacks'
         min_contribution = min(max_contribution, continue_cost + max(continue_cost, BIG_BLIND))
         return (self.pips[active] + min_contribution, self.pips[active] + max_contribution)
 
+    def betting_closed(self):
+        '''
+        Returns True if the pot is even and a player is all-in, so no further betting is possible.
+        '''
+        return self.pips[0] == self.pips[1] and (self.stacks[0] == 0 or self.stacks[1] == 0)
+
     def proceed_street(self):
         '''
         Resets the players' pips and advances the game tree to the next round of betting.
@@ -203,6 +229,91 @@ class RoundState(namedtuple('_RoundState', ['button', 'street', 'pips', 'stacks'
         return RoundState(self.button + 1, self.street, new_pips, new_stacks, self.hands, self.deck, self)
 
 
+def shuffled_deck(match_seed, round_num):
+    '''
+    Returns the deck for one round, shuffled by a generator derived from the match seed.
+
+    Each round gets its own stream, so the cards dealt in a round do not depend on which
+    process plays it or on how many rounds were played before it.
+    '''
+    deck = eval7.Deck()
+    random.Random('{}-{}'.format(match_seed, round_num)).shuffle(deck.cards)
+    return deck
+
+
+def bot_files(path):
+    '''
+    Yields the relative paths of a pokerbot directory's files in a stable order, skipping
+    Python caches and hidden files, where pokerbots keep state between matches.
+    '''
+    for root, dirs, files in os.walk(path):
+        dirs[:] = sorted(name for name in dirs if name != '__pycache__' and not name.startswith('.'))
+        for name in sorted(files):
+            if not name.startswith('.') and not name.endswith('.pyc'):
+                yield os.path.relpath(os.path.join(root, name), path)
+
+
+def file_signatures(path):
+    '''
+    Returns the modification time and size of every file in a pokerbot directory.
+    '''
+    signatures = {}
+    for name in bot_files(path):
+        stat = os.stat(os.path.join(path, name))
+        signatures[name] = (stat.st_mtime_ns, stat.st_size)
+    return signatures
+
+
+def bot_hash(path, exclude=()):
+    '''
+    Returns a SHA-256 hash of the contents of a pokerbot directory, including commands.json.
+
+    Args:
+        path (str): The pokerbot directory.
+        exclude (iterable): Relative paths to leave out, such as build outputs.
+    '''
+    exclude = set(exclude)
+    digest = hashlib.sha256()
+    for name in bot_files(path):
+        if name not in exclude:
+            with open(os.path.join(path, name), 'rb') as bot_file:
+                digest.update(name.encode() + b'\0' + hashlib.sha256(bot_file.read()).digest())
+    return digest.hexdigest()
+
+
+# zygotes outlive single matches so that later matches in the same process can reuse them, and
+# are keyed on the pokerbot's path with the bot_hash of the files they imported
+ZYGOTES = {}
+
+
+def zygote_for(path, build_outputs=()):
+    '''
+    Returns a zygote for the pokerbot at path, replacing one that has imported older files.
+    '''
+    key = os.path.abspath(path)
+    files_hash = bot_hash(path, build_outputs)
+    if key in ZYGOTES and ZYGOTES[key][0] != files_hash:
+        ZYGOTES.pop(key)[1].stop()
+    if key not in ZYGOTES:
+        ZYGOTES[key] = (files_hash, Zygote(path))
+    return ZYGOTES[key][1]
+
+
+def bot_seed(match_seed, round_num, name):
+    '''
+    Returns the seed sent to one pokerbot for one round, so that pokerbots which draw their
+    randomness from it act the same in every replay of the match.
+    '''
+    return random.Random('{}-{}-{}'.format(match_seed, round_num, name)).randrange(2**32)
+
+
+def limit_memory():
+    '''
+    Caps the address space of a pokerbot subprocess at BOT_MEMORY_LIMIT bytes.
+    '''
+    resource.setrlimit(resource.RLIMIT_AS, (BOT_MEMORY_LIMIT, BOT_MEMORY_LIMIT))
+
+
 class Player():
     '''
     Handles subprocess and socket interactions with one player's pokerbot.
@@ -214,9 +325,18 @@ class Player():
         self.game_clock = STARTING_GAME_CLOCK
         self.bankroll = 0
         self.commands = None
+        self.stateless = False
+        # files written by the last build, as recorded by cached_build
+        self.build_outputs = []
+        self.log_filename = name + '.txt'
         self.bot_subprocess = None
         self.socketfile = None
         self.bytes_queue = Queue()
+        # resident memory after each round past MEMORY_WARMUP_ROUNDS
+        self.memory_samples = []
+        self.peak_memory = 0
+        self.memory_rounds = 0
+        self.shard_memory = None
 
     def build(self):
         '''
@@ -229,6 +349,7 @@ class Player():
                     isinstance(commands['build'], list) and
                     isinstance(commands['run'], list)):
                 self.commands = commands
+                self.stateless = commands.get('stateless') is True
             else:
                 print(self.name, 'commands.json missing command')
         except FileNotFoundError:
@@ -236,20 +357,67 @@ class Player():
         except json.decoder.JSONDecodeError:
             print(self.name, 'commands.json misformatted')
         if self.commands is not None and len(self.commands['build']) > 0:
+            if BUILD_CACHE_DIRECTORY is None:
+                self.run_build()
+            else:
+                self.cached_build()
+
+    def run_build(self):
+        '''
+        Runs the build commands from commands.json.
+
+        Returns:
+            bool: True if the build exited successfully.
+        '''
+        try:
+            proc = subprocess.run(self.commands['build'],
+                                  stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                  cwd=self.path, timeout=BUILD_TIMEOUT, check=False)
+            self.bytes_queue.put(proc.stdout)
+            return proc.returncode == 0
+        except subprocess.TimeoutExpired as timeout_expired:
+            error_message = 'Timed out waiting for ' + self.name + ' to build'
+            print(error_message)
+            self.bytes_queue.put(timeout_expired.stdout)
+            self.bytes_queue.put(error_message.encode())
+        except (TypeError, ValueError):
+            print(self.name, 'build command misformatted')
+        except OSError:
+            print(self.name, 'build failed - check "build" in commands.json')
+        return False
+
+    def cached_build(self):
+        '''
+        Builds the pokerbot unless its sources are unchanged since the last successful build.
+
+        A stamp in BUILD_CACHE_DIRECTORY records the hash of the bot directory and the files the
+        build wrote, which are left out of the hash. The stamp is locked while it is checked and
+        the build runs, so parallel engines wait for one build instead of racing each other.
+        '''
+        os.makedirs(BUILD_CACHE_DIRECTORY, exist_ok=True)
+        stamp_name = hashlib.sha256(os.path.abspath(self.path).encode()).hexdigest()[:16] + '.json'
+        stamp_path = os.path.join(BUILD_CACHE_DIRECTORY, stamp_name)
+        with open(stamp_path + '.lock', 'w') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
             try:
-                proc = subprocess.run(self.commands['build'],
-                                      stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
-                                      cwd=self.path, timeout=BUILD_TIMEOUT, check=False)
-                self.bytes_queue.put(proc.stdout)
-            except subprocess.TimeoutExpired as timeout_expired:
-                error_message = 'Timed out waiting for ' + self.name + ' to build'
-                print(error_message)
-                self.bytes_queue.put(timeout_expired.stdout)
-                self.bytes_queue.put(error_message.encode())
-            except (TypeError, ValueError):
-                print(self.name, 'build command misformatted')
-            except OSError:
-                print(self.name, 'build failed - check "build" in commands.json')
+                with open(stamp_path, 'r') as stamp_file:
+                    stamp = json.load(stamp_file)
+            except (OSError, ValueError):
+                stamp = {'hash': None, 'outputs': []}
+            outputs = [output for output in stamp['outputs'] if os.path.exists(os.path.join(self.path, output))]
+            if outputs == stamp['outputs'] and stamp['hash'] == bot_hash(self.path, outputs):
+                print(self.name, 'build is up to date')
+                self.build_outputs = outputs
+                return
+            before = file_signatures(self.path)
+            if not self.run_build():
+                return
+            after = file_signatures(self.path)
+            outputs = sorted(set(outputs) | {name for name, signature in after.items() if before.get(name) != signature})
+            with open(stamp_path, 'w') as stamp_file:
+                json.dump({'hash': bot_hash(self.path, outputs), 'outputs': outputs}, stamp_file)
+            self.build_outputs = outputs
 
     def run(self):
         '''
@@ -263,9 +431,13 @@ class Player():
                     server_socket.settimeout(CONNECT_TIMEOUT)
                     server_socket.listen()
                     port = server_socket.getsockname()[1]
-                    proc = subprocess.Popen(self.commands['run'] + [str(port)],
-                                            stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
-                                            cwd=self.path)
+                    if USE_ZYGOTES and forkable(self.commands):
+                        proc = zygote_for(self.path, self.build_outputs).spawn(port, BOT_MEMORY_LIMIT)
+                    else:
+                        proc = subprocess.Popen(self.commands['run'] + [str(port)],
+                                                stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                                cwd=self.path,
+                                                preexec_fn=limit_memory if BOT_MEMORY_LIMIT and resource is not None else None)
                     self.bot_subprocess = proc
                     # function for bot listening
                     def enqueue_output(out, queue):
@@ -296,6 +468,66 @@ class Player():
             except socket.timeout:
                 print('Timed out waiting for', self.name, 'to connect')
 
+    def sample_memory(self):
+        '''
+        Records the pokerbot's current and peak resident memory from /proc.
+        '''
+        if self.bot_subprocess is None:
+            return
+        current_memory = peak_memory = None
+        try:
+            with open('/proc/{}/status'.format(self.bot_subprocess.pid), 'r') as status_file:
+                for line in status_file:
+                    if line.startswith('VmRSS:'):
+                        current_memory = int(line.split()[1]) * 1024
+                    elif line.startswith('VmHWM:'):
+                        peak_memory = int(line.split()[1]) * 1024
+        except (OSError, IndexError, ValueError):
+            return  # no /proc on this platform, or the bot has exited
+        if current_memory is None:
+            return
+        self.peak_memory = max(self.peak_memory, current_memory, peak_memory or 0)
+        self.memory_rounds += 1
+        if self.memory_rounds > MEMORY_WARMUP_ROUNDS:
+            self.memory_samples.append(current_memory)
+
+    def memory_growth(self):
+        '''
+        Returns the change in the pokerbot's resident memory per 1000 rounds, in bytes, as the
+        least-squares slope over the rounds after MEMORY_WARMUP_ROUNDS, or 0 if there are too few.
+        '''
+        samples = self.memory_samples
+        if len(samples) < 2:
+            return 0.
+        mean_round = (len(samples) - 1) / 2
+        mean_memory = sum(samples) / len(samples)
+        covariance = sum((i - mean_round) * (memory - mean_memory) for i, memory in enumerate(samples))
+        variance = sum((i - mean_round) ** 2 for i in range(len(samples)))
+        return covariance / variance * 1000
+
+    def memory_summary(self):
+        '''
+        Returns a line describing the pokerbot's peak memory and its growth per 1000 rounds.
+        '''
+        if self.memory_rounds == 0:
+            return None
+        return MEMORY(self.name, self.peak_memory, self.memory_growth())
+
+    def report_memory_limit(self):
+        '''
+        Explains a crashed pokerbot when BOT_MEMORY_LIMIT may be the cause.
+        '''
+        if not BOT_MEMORY_LIMIT or self.bot_subprocess.returncode == 0:
+            return
+        limit = '{:.0f} MB'.format(BOT_MEMORY_LIMIT / 2**20)
+        output = b''.join(line for line in self.bytes_queue.queue if isinstance(line, bytes))
+        if b'MemoryError' in output or b'Cannot allocate memory' in output:
+            print(self.name, 'ran out of memory - exceeded BOT_MEMORY_LIMIT of', limit,
+                  '(peak resident memory {:.1f} MB)'.format(self.peak_memory / 2**20))
+        else:
+            print(self.name, 'crashed with exit code', self.bot_subprocess.returncode,
+                  'while capped at BOT_MEMORY_LIMIT of', limit, '- check whether the cap is too low')
+
     def stop(self):
         '''
         Closes the socket connection and stops the pokerbot.
@@ -320,7 +552,8 @@ class Player():
                 self.bot_subprocess.kill()
                 outs, _ = self.bot_subprocess.communicate()
                 self.bytes_queue.put(outs)
-        with open(self.name + '.txt', 'wb') as log_file:
+            self.report_memory_limit()
+        with open(self.log_filename, 'wb') as log_file:
             bytes_written = 0
             for output in self.bytes_queue.queue:
                 try:
@@ -402,12 +635,30 @@ class Game():
     Manages logging and the high-level game procedure.
     '''
 
-    def __init__(self):
-        self.log = ['Build4Good Pokerbots - ' + PLAYER_1_NAME + ' vs ' + PLAYER_2_NAME]
+    def __init__(self, player_1=None, player_2=None, log_filename=None):
+        '''
+        Args:
+            player_1 (tuple): (name, path) of the first pokerbot, defaults to PLAYER_1_NAME and PLAYER_1_PATH.
+            player_2 (tuple): (name, path) of the second pokerbot, defaults to PLAYER_2_NAME and PLAYER_2_PATH.
+            log_filename (str): The game log path without '.txt', defaults to GAME_LOG_FILENAME.
+                The pokerbots' own logs are written to the same directory.
+        '''
+        self.specs = [player_1 or (PLAYER_1_NAME, PLAYER_1_PATH), player_2 or (PLAYER_2_NAME, PLAYER_2_PATH)]
+        self.log_filename = log_filename or GAME_LOG_FILENAME
+        self.log_directory = os.path.dirname(self.log_filename)
+        self.seed = MATCH_SEED if MATCH_SEED is not None else random.randrange(2**32)
+        names = [name for name, _ in self.specs]
+        self.log = ['Build4Good Pokerbots - ' + names[0] + ' vs ' + names[1],
+                    'Match seed: ' + str(self.seed)]
         self.player_messages = [[], []]
-        self.preflop_bets = {PLAYER_1_NAME: 0, PLAYER_2_NAME: 0}
-        self.flop_bets = {PLAYER_1_NAME: 0, PLAYER_2_NAME: 0}
-        self.turn_bets = {PLAYER_1_NAME: 0, PLAYER_2_NAME: 0}
+        self.preflop_bets = {name: 0 for name in names}
+        self.flop_bets = {name: 0 for name in names}
+        self.turn_bets = {name: 0 for name in names}
+        self.seats = []
+        self.deltas = []
+        self.forfeited_rounds = 0
+        self.log_written = False
+        self.bot_seeds = [0, 0]
 
     def log_round_state(self, players, round_state):
         '''
@@ -429,8 +680,8 @@ class Game():
             self.log.append('{} posts the blind of {}'.format(players[1].name, BIG_BLIND))
             self.log.append('{} dealt {}'.format(players[0].name, PCARDS(round_state.hands[0])))
             self.log.append('{} dealt {}'.format(players[1].name, PCARDS(round_state.hands[1])))
-            self.player_messages[0] = ['T0.', 'P0', 'H' + CCARDS(round_state.hands[0])]
-            self.player_messages[1] = ['T0.', 'P1', 'H' + CCARDS(round_state.hands[1])]
+            self.player_messages[0] = ['T0.', 'P0', 'S' + str(self.bot_seeds[0]), 'H' + CCARDS(round_state.hands[0])]
+            self.player_messages[1] = ['T0.', 'P1', 'S' + str(self.bot_seeds[1]), 'H' + CCARDS(round_state.hands[1])]
         elif round_state.street > 0 and round_state.button == 1:
             board = round_state.deck.peek(round_state.street)
             self.log.append(STREET_NAMES[round_state.street // 2 - 1] + ' ' + PCARDS(board) +
@@ -476,12 +727,12 @@ class Game():
         self.player_messages[0].append('D' + str(round_state.deltas[0]))
         self.player_messages[1].append('D' + str(round_state.deltas[1]))
 
-    def run_round(self, players):
+    def run_round(self, players, round_num):
         '''
         Runs one round of poker.
         '''
-        deck = eval7.Deck()
-        deck.shuffle()
+        deck = shuffled_deck(self.seed, round_num)
+        self.bot_seeds = [bot_seed(self.seed, round_num, player.name) for player in players]
         hands = [deck.deal(3), deck.deal(3)]
         pips = [SMALL_BLIND, BIG_BLIND]
         stacks = [STARTING_STACK - SMALL_BLIND, STARTING_STACK - BIG_BLIND]
@@ -490,7 +741,11 @@ class Game():
             self.log_round_state(players, round_state)
             active = round_state.button % 2
             player = players[active]
-            action = player.query(round_state, self.player_messages[active], self.log)
+            if AUTO_RUNOUT and round_state.betting_closed():
+                # only check or fold remain, so deal out the board without asking the bots
+                action = CheckAction()
+            else:
+                action = player.query(round_state, self.player_messages[active], self.log)
             bet_override = (round_state.pips == [0, 0])
             self.log_action(player.name, action, bet_override)
             round_state = round_state.proceed(action)
@@ -499,35 +754,360 @@ class Game():
             player.query(round_state, player_message, self.log)
             player.bankroll += delta
 
-    def run(self):
+    def forfeit_decided_match(self, players, round_num):
         '''
-        Runs one game of poker.
+        Ends the match early if the trailing player cannot catch up even if the leader folds
+        every remaining round, settling those rounds as if the leader had forfeited its blinds.
+
+        Args:
+            players (list): The players in seat order for the next round (small blind first).
+            round_num (int): The number of the round that just finished.
+
+        Returns:
+            bool: True if the match was decided and the remaining rounds were settled.
         '''
-        print('Starting the Pokerbots engine...')
-        players = [
-            Player(PLAYER_1_NAME, PLAYER_1_PATH),
-            Player(PLAYER_2_NAME, PLAYER_2_PATH)
-        ]
-        for player in players:
-            player.build()
-        for player in players:
-            player.run()
-        for round_num in range(1, NUM_ROUNDS + 1):
+        remaining_rounds = NUM_ROUNDS - round_num
+        if remaining_rounds == 0:
+            return False
+        leader = 0 if players[0].bankroll > players[1].bankroll else 1
+        # the leader posts the small blind in every other round, starting with its next seat
+        leader_small_blinds = (remaining_rounds + 1 - leader) // 2
+        max_loss = leader_small_blinds * SMALL_BLIND + (remaining_rounds - leader_small_blinds) * BIG_BLIND
+        if players[leader].bankroll - players[1-leader].bankroll <= 2 * max_loss:
+            return False
+        players[leader].bankroll -= max_loss
+        players[1-leader].bankroll += max_loss
+        self.forfeited_rounds = remaining_rounds
+        for forfeit in range(remaining_rounds):
+            loss = SMALL_BLIND if forfeit % 2 == leader else BIG_BLIND
+            self.deltas.append([-loss if seat is players[leader] else loss for seat in self.seats])
+        self.log.append('')
+        self.log.append('Match decided after round #{}: {} forfeits the blinds of the remaining {} rounds'.format(
+            round_num, players[leader].name, remaining_rounds))
+        self.log.append('{} awarded {}'.format(players[leader].name, -max_loss))
+        self.log.append('{} awarded {}'.format(players[1-leader].name, max_loss))
+        print('Match decided after round', round_num)
+        return True
+
+    def run_rounds(self, players, first_round=1):
+        '''
+        Plays the rounds of the match from first_round on with one pair of pokerbots,
+        checkpointing every CHECKPOINT_INTERVAL rounds.
+
+        Returns:
+            list: The players in the seat order following the last round.
+        '''
+        for round_num in range(first_round, NUM_ROUNDS + 1):
             self.log.append('')
             self.log.append('Round #' + str(round_num) + STATUS(players))
-            self.run_round(players)
+            bankrolls = [player.bankroll for player in self.seats]
+            self.run_round(players, round_num)
+            self.deltas.append([player.bankroll - bankroll for player, bankroll in zip(self.seats, bankrolls)])
             self.log.append('Winning counts at the end of the round: ' + STATUS(players))
+            for player in players:
+                player.sample_memory()
 
             players = players[::-1]
+            if EARLY_TERMINATION and self.forfeit_decided_match(players, round_num):
+                if (NUM_ROUNDS - round_num) % 2 == 1:
+                    players = players[::-1]
+                break
+            if CHECKPOINT_INTERVAL and round_num % CHECKPOINT_INTERVAL == 0 and round_num < NUM_ROUNDS:
+                self.checkpoint(round_num)
+        return players
+
+    def flush_log(self):
+        '''
+        Appends the buffered log lines to the game log file and empties the buffer.
+
+        Returns:
+            int: The size of the game log file in bytes.
+        '''
+        name = self.log_filename + '.txt'
+        with open(name, 'a' if self.log_written else 'w') as log_file:
+            if self.log:
+                log_file.write(('\n' if self.log_written else '') + '\n'.join(self.log))
+        self.log = []
+        self.log_written = True
+        return os.path.getsize(name)
+
+    def checkpoint(self, round_num):
+        '''
+        Flushes the game log and records everything needed to resume after round_num.
+
+        Rounds are dealt from the match seed and the round number, so the seed and the round
+        number fix the rest of the deal schedule.
+        '''
+        checkpoint = {
+            'specs': self.specs,
+            'num_rounds': NUM_ROUNDS,
+            'seed': self.seed,
+            'round_num': round_num,
+            'bankrolls': [player.bankroll for player in self.seats],
+            'game_clocks': [player.game_clock for player in self.seats],
+            'deltas': self.deltas,
+            'log_offset': self.flush_log(),
+        }
+        name = self.log_filename + '.checkpoint.json'
+        with open(name + '.tmp', 'w') as checkpoint_file:
+            json.dump(checkpoint, checkpoint_file)
+        os.replace(name + '.tmp', name)
+
+    def load_checkpoint(self):
+        '''
+        Returns the checkpoint left by an interrupted run of this match, or None.
+        '''
+        try:
+            with open(self.log_filename + '.checkpoint.json', 'r') as checkpoint_file:
+                checkpoint = json.load(checkpoint_file)
+        except (OSError, ValueError):
+            return None
+        if checkpoint['specs'] != [list(spec) for spec in self.specs] or checkpoint['num_rounds'] != NUM_ROUNDS:
+            print('Ignoring checkpoint of a different match')
+            return None
+        return checkpoint
+
+    def restore(self, checkpoint):
+        '''
+        Rewinds the game log and the players to a checkpoint.
+
+        Returns:
+            int: The first round still to be played.
+        '''
+        self.seed = checkpoint['seed']
+        self.deltas = checkpoint['deltas']
+        for player, bankroll, game_clock in zip(self.seats, checkpoint['bankrolls'], checkpoint['game_clocks']):
+            player.bankroll = bankroll
+            player.game_clock = game_clock
+        with open(self.log_filename + '.txt', 'r+') as log_file:
+            log_file.truncate(checkpoint['log_offset'])
+        self.log = []
+        self.log_written = True
+        print('Resuming after round', checkpoint['round_num'])
+        return checkpoint['round_num'] + 1
+
+    def run_shards(self, players):
+        '''
+        Splits the rounds into NUM_SHARDS contiguous blocks, plays each block with its own pair
+        of pokerbot processes in parallel, then merges the rounds back into one log in order.
+
+        Only valid when both pokerbots declare themselves stateless, since no bot instance
+        sees every round. Each shard gets the share of STARTING_GAME_CLOCK matching its share
+        of the rounds.
+
+        Returns:
+            list: The players in the seat order following the last round.
+        '''
+        bounds = [NUM_ROUNDS * shard // NUM_SHARDS for shard in range(NUM_SHARDS + 1)]
+        blocks = [range(bounds[shard] + 1, bounds[shard + 1] + 1) for shard in range(NUM_SHARDS)]
+        blocks = [block for block in blocks if len(block) > 0]
+        specs = [(player.name, player.path, player.commands) for player in players]
+        print('Playing', NUM_ROUNDS, 'rounds in', len(blocks), 'shards')
+        with ProcessPoolExecutor(max_workers=len(blocks)) as executor:
+            futures = [executor.submit(run_shard, shard, block, self.seed, specs, self.log_directory)
+                       for shard, block in enumerate(blocks)]
+            results = [future.result() for future in futures]
+        seats = players
+        for index, player in enumerate(seats):
+            memory = [result[1][index] for result in results if result[1][index] is not None]
+            if memory:
+                player.shard_memory = (max(peak for peak, _ in memory), max(growth for _, growth in memory))
+        round_num = 0
+        for rounds, _ in results:
+            for lines, deltas in rounds:
+                round_num += 1
+                self.log.append('')
+                self.log.append('Round #' + str(round_num) + STATUS(players))
+                self.log.extend(lines)
+                for player, delta in zip(seats, deltas):
+                    player.bankroll += delta
+                self.deltas.append(deltas)
+                self.log.append('Winning counts at the end of the round: ' + STATUS(players))
+
+                players = players[::-1]
+                if EARLY_TERMINATION and self.forfeit_decided_match(players, round_num):
+                    if (NUM_ROUNDS - round_num) % 2 == 1:
+                        players = players[::-1]
+                    return players
+        return players
+
+    def cache_filename(self, players):
+        '''
+        Returns where the result of this match is cached, or None if results are not cached.
+
+        Only matches with a fixed MATCH_SEED are cached. The key covers the seed, the names and
+        contents of both pokerbots and the config.py parameters that change how a match plays out.
+        The pokerbots are hashed once built, leaving out their build outputs as cached_build does,
+        so that a build writing into a pokerbot's directory does not change its key.
+        '''
+        if MATCH_CACHE_DIRECTORY is None or MATCH_SEED is None:
+            return None
+        key = {
+            'seed': self.seed,
+            'bots': [(player.name, bot_hash(player.path, player.build_outputs)) for player in players],
+            'config': [NUM_ROUNDS, STARTING_STACK, BIG_BLIND, SMALL_BLIND, STARTING_GAME_CLOCK,
+                       ENFORCE_GAME_CLOCK, EARLY_TERMINATION, AUTO_RUNOUT],
+        }
+        digest = hashlib.sha256(json.dumps(key).encode()).hexdigest()
+        return os.path.join(MATCH_CACHE_DIRECTORY, digest + '.json.gz')
+
+    def load_cached_result(self, name):
+        '''
+        Writes the game log of a cached match and returns its MatchResult.
+        '''
+        with gzip.open(name, 'rt') as cache_file:
+            cached = json.load(cache_file)
+        print('Using cached result from', name)
+        print('Writing', self.log_filename + '.txt')
+        with open(self.log_filename + '.txt', 'w') as log_file:
+            log_file.write(cached['log'])
+        return MatchResult(**cached['result'])
+
+    def save_cached_result(self, name, result):
+        '''
+        Stores a finished match's MatchResult and game log.
+        '''
+        os.makedirs(MATCH_CACHE_DIRECTORY, exist_ok=True)
+        with open(self.log_filename + '.txt', 'r') as log_file:
+            log = log_file.read()
+        with gzip.open(name + '.tmp', 'wt') as cache_file:
+            json.dump({'result': result._asdict(), 'log': log}, cache_file)
+        os.replace(name + '.tmp', name)
+
+    def run(self, resume=False):
+        '''
+        Runs one game of poker.
+
+        Args:
+            resume (bool): Whether to continue from the checkpoint of an interrupted run. Stateless
+                pokerbots pick up after the last checkpointed round; other pokerbots replay the
+                match from the first round with the same cards.
+
+        Returns:
+            MatchResult: The final bankrolls and per-round deltas of both players.
+        '''
+        print('Starting the Pokerbots engine...')
+        players = [Player(name, path) for name, path in self.specs]
+        for player in players:
+            player.log_filename = os.path.join(self.log_directory, player.log_filename)
+        self.seats = players
+        for player in players:
+            player.build()
+        cache_filename = self.cache_filename(players)
+        if cache_filename is not None and os.path.exists(cache_filename):
+            return self.load_cached_result(cache_filename)
+        sharded = NUM_SHARDS > 1 and all(player.stateless for player in players)
+        if sharded:
+            players = self.run_shards(players)
+        else:
+            first_round = 1
+            checkpoint = self.load_checkpoint() if resume else None
+            if checkpoint is not None and all(player.stateless for player in players):
+                first_round = self.restore(checkpoint)
+                # player 1 posts the small blind in odd rounds
+                players = players if first_round % 2 == 1 else players[::-1]
+            elif checkpoint is not None:
+                print('Replaying the match from round 1 since the bots are not stateless')
+                self.seed = checkpoint['seed']
+                self.log[1] = 'Match seed: ' + str(self.seed)
+            for player in players:
+                player.run()
+            players = self.run_rounds(players, first_round)
         self.log.append('')
         self.log.append('Final' + STATUS(players))
+        for player in players:
+            if player.shard_memory is not None:
+                summary = MEMORY(player.name, *player.shard_memory)
+            else:
+                summary = player.memory_summary()
+            if summary is not None:
+                self.log.append(summary)
+                print(summary)
+        # sharded players only built their pokerbots, and stopping them writes the build output
         for player in players:
             player.stop()
-        name = GAME_LOG_FILENAME + '.txt'
-        print('Writing', name)
-        with open(name, 'w') as log_file:
-            log_file.write('\n'.join(self.log))
+        print('Writing', self.log_filename + '.txt')
+        self.flush_log()
+        if os.path.exists(self.log_filename + '.checkpoint.json'):
+            os.remove(self.log_filename + '.checkpoint.json')
+        result = MatchResult([player.name for player in self.seats], [player.bankroll for player in self.seats],
+                             self.deltas, self.seed, self.forfeited_rounds)
+        if cache_filename is not None:
+            self.save_cached_result(cache_filename, result)
+        return result
+
+
+def run_shard(shard, round_nums, seed, specs, log_directory):
+    '''
+    Plays one block of rounds of a sharded match with a fresh pair of pokerbot processes.
+
+    Args:
+        shard (int): Index of the shard, used to name the pokerbots' log files.
+        round_nums (range): The consecutive round numbers to play.
+        seed (int): The match seed, which fixes the cards dealt in every round.
+        specs (list): (name, path, commands) for player 1 and player 2.
+        log_directory (str): Where to write the pokerbots' logs.
+
+    Returns:
+        tuple: A list with the log lines and [player 1, player 2] deltas of each round, and
+        each player's (peak memory, memory growth) or None if memory was not sampled.
+    '''
+    game = Game(specs[0][:2], specs[1][:2])
+    game.seed = seed
+    seats = []
+    for name, path, commands in specs:
+        player = Player(name, path)
+        player.commands = commands
+        player.log_filename = os.path.join(log_directory, '{}.shard{}.txt'.format(name, shard))
+        player.game_clock = STARTING_GAME_CLOCK * len(round_nums) / NUM_ROUNDS
+        seats.append(player)
+    for player in seats:
+        player.run()
+    # player 1 posts the small blind in odd rounds
+    players = seats if round_nums[0] % 2 == 1 else seats[::-1]
+    rounds = []
+    for round_num in round_nums:
+        start = len(game.log)
+        bankrolls = [player.bankroll for player in seats]
+        game.run_round(players, round_num)
+        rounds.append((game.log[start:], [player.bankroll - bankroll for player, bankroll in zip(seats, bankrolls)]))
+        for player in players:
+            player.sample_memory()
+        players = players[::-1]
+    for player in seats:
+        player.stop()
+    memory = [(player.peak_memory, player.memory_growth()) if player.memory_rounds > 0 else None
+              for player in seats]
+    return rounds, memory
+
+
+def play_match(player_1, player_2, log_filename, overrides=None, quiet=True, resume=False):
+    '''
+    Plays one match and returns its MatchResult. Meant to be submitted to a process pool by
+    the bracket, league and tuning tools.
+
+    Args:
+        player_1 (tuple): (name, path) of the first pokerbot.
+        player_2 (tuple): (name, path) of the second pokerbot.
+        log_filename (str): The game log path without '.txt'. Its directory is created if needed.
+        overrides (dict): config.py parameters to replace for this match only, e.g. {'NUM_ROUNDS': 1000}.
+        quiet (bool): Whether to silence the engine's console output.
+        resume (bool): Whether to continue from the checkpoint of an interrupted run.
+    '''
+    overrides = overrides or {}
+    for key in overrides:
+        if not key.isupper() or key not in globals():
+            raise KeyError('unknown config parameter ' + key)
+    saved = {key: globals()[key] for key in overrides}
+    globals().update(overrides)
+    try:
+        if os.path.dirname(log_filename):
+            os.makedirs(os.path.dirname(log_filename), exist_ok=True)
+        with contextlib.redirect_stdout(io.StringIO()) if quiet else contextlib.nullcontext():
+            return Game(player_1, player_2, log_filename).run(resume)
+    finally:
+        globals().update(saved)
 
 
 if __name__ == '__main__':
-    Game().run()
+    Game().run(resume='--resume' in sys.argv[1:])
@@ -0,0 +1,226 @@
+'''
+Equity of B4G Hold'em hole cards against a random opponent hand.
+
+The opponent holds 3 of the cards we cannot see, and the board is completed to 4 cards. On the
+final street the board is known and every opponent hand is enumerated, C(45, 3) = 14,190 of
+them, or counted by binary search in river.py's sorted table of the board if NumPy is
+installed. On earlier streets opponent hands and runouts are sampled together, in batches,
+until the standard error of the estimate falls below a target or the time budget runs out.
+'''
+from collections import namedtuple
+from itertools import combinations
+import math
+import random
+import time
+
+import eval7
+
+from .cards import ALL_CARDS, EVAL7_CARDS, NAMES, card_mask, mask_codes
+from .states import NUM_ROUNDS
+try:
+    from .river import river_equity
+except ImportError:  # NumPy is not installed
+    river_equity = None
+
+HOLE_SIZE = 3
+BOARD_SIZE = 4
+DEFAULT_TIME_BUDGET = 0.005
+DEFAULT_TARGET_ERROR = 0.01
+# samples drawn between checks of the clock and of the standard error
+SAMPLE_BATCH = 64
+# samples drawn before the standard error is trusted
+MIN_SAMPLES = 256
+# share of the game clock left per remaining decision that is spent on equity
+CLOCK_SHARE = 0.5
+DECISIONS_PER_ROUND = 3
+
+EquityEstimate = namedtuple('EquityEstimate', ['equity', 'standard_error', 'samples'])
+
+CARDS = EVAL7_CARDS
+# the eval7 Cards by card code
+DECK = [CARDS[card] for card in NAMES]
+
+
+def unseen_cards(my_cards, board_cards):
+    '''
+    Returns the eval7 Cards that are neither in our hand nor on the board.
+
+    Arguments:
+    my_cards: list of our card strings.
+    board_cards: list of board card strings.
+    '''
+    return [DECK[code] for code in mask_codes(ALL_CARDS & ~(card_mask(my_cards) | card_mask(board_cards)))]
+
+
+def exact_equity(my_cards, board_cards):
+    '''
+    Returns our equity on a complete board against every unordered opponent hand, counting
+    ties as half a win.
+    '''
+    board = [CARDS[card] for card in board_cards]
+    our_score = eval7.evaluate([CARDS[card] for card in my_cards] + board)
+    evaluate = eval7.evaluate
+    wins = 0.
+    count = 0
+    for opponent_hand in combinations(unseen_cards(my_cards, board_cards), HOLE_SIZE):
+        opponent_score = evaluate(list(opponent_hand) + board)
+        if our_score > opponent_score:
+            wins += 1.
+        elif our_score == opponent_score:
+            wins += 0.5
+        count += 1
+    return wins / count
+
+
+def clock_budget(game_state):
+    '''
+    Returns the seconds an equity estimate may take, spreading CLOCK_SHARE of the remaining game
+    clock evenly over the decisions expected in the remaining rounds.
+    '''
+    rounds_left = max(1, NUM_ROUNDS - game_state.round_num + 1)
+    return CLOCK_SHARE * game_state.game_clock / (rounds_left * DECISIONS_PER_ROUND)
+
+
+def _estimate(wins, ties, count):
+    '''
+    Returns the EquityEstimate of count sampled outcomes with the given wins and ties.
+    '''
+    # outcomes are 1, 0.5 or 0, so the sum of squares follows from the win and tie counts
+    mean = (wins + 0.5 * ties) / count
+    variance = max(0., (wins + 0.25 * ties) / count - mean * mean)
+    return EquityEstimate(mean, math.sqrt(variance / max(1, count - 1)), count)
+
+
+def monte_carlo_equity(my_cards, board_cards, target_error=DEFAULT_TARGET_ERROR, time_budget=DEFAULT_TIME_BUDGET,
+                       max_samples=None, rng=random):
+    '''
+    Estimates our equity by sampling opponent hands and the rest of the board in batches of
+    SAMPLE_BATCH, stopping once the standard error is at most target_error, the time budget is
+    spent or max_samples have been drawn. At least one batch is always drawn.
+
+    Arguments:
+    my_cards: list of our card strings.
+    board_cards: list of the board card strings dealt so far.
+    target_error: standard error to stop at, 0 to use the whole time budget.
+    time_budget: seconds to spend at most, see clock_budget.
+    max_samples: samples to draw at most, or None.
+    rng: the random.Random (or random module) to sample with.
+
+    Returns:
+    EquityEstimate: the equity, its standard error and the number of samples.
+    '''
+    deadline = time.perf_counter() + time_budget
+    unseen = unseen_cards(my_cards, board_cards)
+    hand = [CARDS[card] for card in my_cards]
+    board = [CARDS[card] for card in board_cards]
+    draw = HOLE_SIZE + BOARD_SIZE - len(board)
+    evaluate = eval7.evaluate
+    sample = rng.sample
+    wins = 0.
+    ties = 0
+    count = 0
+    while True:
+        for _ in range(SAMPLE_BATCH):
+            cards = sample(unseen, draw)
+            full_board = board + cards[HOLE_SIZE:]
+            our_score = evaluate(hand + full_board)
+            opponent_score = evaluate(cards[:HOLE_SIZE] + full_board)
+            if our_score > opponent_score:
+                wins += 1.
+            elif our_score == opponent_score:
+                ties += 1
+        count += SAMPLE_BATCH
+        estimate = _estimate(wins, ties, count)
+        if ((count >= MIN_SAMPLES and estimate.standard_error <= target_error) or time.perf_counter() > deadline
+                or (max_samples is not None and count >= max_samples)):
+            return estimate
+
+
+def estimate_equity(my_cards, board_cards, time_budget=DEFAULT_TIME_BUDGET, target_error=DEFAULT_TARGET_ERROR,
+                    rng=random):
+    '''
+    Returns our equity against a random opponent hand: exact on a complete board, otherwise
+    a Monte Carlo estimate within time_budget seconds, see monte_carlo_equity.
+
+    Arguments:
+    my_cards: list of our card strings.
+    board_cards: list of the board card strings dealt so far.
+    time_budget: seconds to spend sampling when the board is incomplete.
+    target_error: standard error at which sampling may stop early.
+    rng: the random.Random (or random module) to sample with.
+    '''
+    if len(board_cards) == BOARD_SIZE:
+        if river_equity is not None:
+            return river_equity(my_cards, board_cards)
+        return exact_equity(my_cards, board_cards)
+    return monte_carlo_equity(my_cards, board_cards, target_error, time_budget, rng=rng).equity
+
+
+class EquitySession():
+    '''
+    The equity of one round's hole cards on the street being played.
+
+    A bot may decide several times on one street. The session keeps the outcomes it has sampled
+    on the current board, so a later decision only tops them up until the standard error reaches
+    the target. A board with more cards starts a fresh sample. On a complete board the exact
+    equity is computed once.
+    '''
+
+    def __init__(self, my_cards, rng=random):
+        self.my_cards = list(my_cards)
+        self.hand = [CARDS[card] for card in my_cards]
+        self.rng = rng
+        self.board_cards = []
+        # sampled wins, ties and outcomes on the current board
+        self.wins = 0
+        self.ties = 0
+        self.count = 0
+        self.exact = None
+
+    def estimate(self, board_cards, target_error=DEFAULT_TARGET_ERROR, time_budget=DEFAULT_TIME_BUDGET):
+        '''
+        Returns an EquityEstimate on the given board from the kept samples, topped up in batches
+        of SAMPLE_BATCH as in monte_carlo_equity, or the exact equity with no error on a complete
+        board.
+        '''
+        if board_cards != self.board_cards:
+            self.board_cards = list(board_cards)
+            self.wins = self.ties = self.count = 0
+            self.exact = None
+        if len(board_cards) == BOARD_SIZE:
+            if self.exact is None:
+                self.exact = estimate_equity(self.my_cards, board_cards)
+            return EquityEstimate(self.exact, 0., 0)
+        if self.count:
+            estimate = _estimate(self.wins, self.ties, self.count)
+            if self.count >= MIN_SAMPLES and estimate.standard_error <= target_error:
+                return estimate
+        deadline = time.perf_counter() + time_budget
+        unseen = unseen_cards(self.my_cards, board_cards)
+        board = [CARDS[card] for card in board_cards]
+        draw = HOLE_SIZE + BOARD_SIZE - len(board)
+        evaluate = eval7.evaluate
+        sample = self.rng.sample
+        while True:
+            for _ in range(SAMPLE_BATCH):
+                cards = sample(unseen, draw)
+                full_board = board + cards[HOLE_SIZE:]
+                our_score = evaluate(self.hand + full_board)
+                opponent_score = evaluate(cards[:HOLE_SIZE] + full_board)
+                if our_score > opponent_score:
+                    self.wins += 1
+                elif our_score == opponent_score:
+                    self.ties += 1
+            self.count += SAMPLE_BATCH
+            estimate = _estimate(self.wins, self.ties, self.count)
+            if ((self.count >= MIN_SAMPLES and estimate.standard_error <= target_error)
+                    or time.perf_counter() > deadline):
+                return estimate
+
+    def equity(self, my_cards, board_cards, time_budget=DEFAULT_TIME_BUDGET):
+        '''
+        Returns our equity like estimate_equity, for the session's hole cards only.
+        '''
+        if list(my_cards) != self.my_cards:
+            raise ValueError('EquitySession of {} asked about {}'.format(self.my_cards, list(my_cards)))
+        return self.estimate(board_cards, time_budget=time_budget).equity
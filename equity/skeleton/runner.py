@@ -2,6 +2,7 @@
 The infrastructure for interacting with the engine.
 '''
 import argparse
+import random
 import socket
 from .actions import FoldAction, CallAction, CheckAction, RaiseAction
 from .states import GameState, TerminalState, RoundState
@@ -23,10 +24,10 @@ class Runner():
         Generator for incoming messages from the engine.
         '''
         while True:
-            packet = self.socketfile.readline().strip().split(' ')
-            if not packet:
+            line = self.socketfile.readline()
+            if not line:  # the engine closed the connection
                 break
-            yield packet
+            yield line.strip().split(' ')
 
     def send(self, action):
         '''
@@ -57,6 +58,8 @@ class Runner():
                     game_state = GameState(game_state.bankroll, float(clause[1:]), game_state.round_num)
                 elif clause[0] == 'P':
                     active = int(float(clause[1:]))
+                elif clause[0] == 'S':
+                    random.seed(int(clause[1:]))
                 elif clause[0] == 'H':
                     hands = [[], []]
                     hands[active] = clause[1:].split(',')
@@ -127,6 +130,9 @@ def run_bot(pokerbot, args):
         return
     socketfile = sock.makefile('rw')
     runner = Runner(pokerbot, socketfile)
-    runner.run()
+    try:
+        runner.run()
+    finally:
+        pokerbot.handle_game_over()
     socketfile.close()
     sock.close()
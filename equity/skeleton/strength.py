@@ -0,0 +1,130 @@
+'''
+Hand strength as a percentile of eval7 ranks.
+
+eval7.evaluate returns a large integer that only means something relative to other hands. For
+each card count a B4G Hold'em bot evaluates, 3 hole cards, 5 on the flop and 7 with the full
+board, strength.dat holds every distinct eval7 value of a hand of that many cards in increasing
+order and its percentile: the fraction of all hands of that many cards with a lower value,
+counting ties as half. A value's percentile is then found by binary search.
+
+The tables are generated offline by enumerating every hand, 133,784,560 of them with 7 cards,
+on NumPy with fasteval.py:
+    python -m skeleton.strength
+run from a bot directory, and then copied to the other bots' skeletons.
+'''
+from array import array
+from bisect import bisect_right
+from itertools import combinations
+import os
+import sys
+
+import eval7
+
+from .cards import EVAL7_CARDS
+
+TABLE_FILENAME = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'strength.dat')
+SCALE = 65535
+SIZES = (3, 5, 7)
+# hands evaluated per NumPy call while generating
+CHUNK = 1 << 21
+
+
+def distribution(size):
+    '''
+    Returns the sorted distinct eval7 values of all hands of size cards and the number of hands
+    with each value, as NumPy arrays.
+    '''
+    import numpy as np
+    from .fasteval import evaluate, hand_masks
+    # every hand splits into its 3 lowest cards and the rest, which all rank above them
+    low_size = min(3, size)
+    low_codes = np.array(list(combinations(range(52), low_size)))
+    high_codes = np.array(list(combinations(range(52), size - low_size)), dtype=np.int64)
+    low_masks = hand_masks(low_codes)
+    high_masks = hand_masks(high_codes)
+    # with no cards above the lowest 3, the rest is one empty hand
+    high_lowest = high_codes[:, 0] if size > low_size else np.array([52])
+    # values are a hand type above 20 bits of ranks, so they pack into 24-bit bins
+    counts = np.zeros(9 << 20, dtype=np.int64)
+    for top in range(52):
+        lows = low_masks[low_codes[:, -1] == top]
+        highs = high_masks[high_lowest > top]
+        rows = max(1, CHUNK // max(1, len(highs)))
+        for start in range(0, len(lows), rows):
+            values = evaluate((lows[start:start + rows, None] | highs[None, :]).ravel())
+            counts += np.bincount((values >> 24) << 20 | values & 0xfffff, minlength=len(counts))
+    bins = np.flatnonzero(counts)
+    return (bins >> 20) << 24 | bins & 0xfffff, counts[bins]
+
+
+def generate():
+    '''
+    Computes the tables of all SIZES and writes them to TABLE_FILENAME.
+    '''
+    with open(TABLE_FILENAME, 'wb') as table_file:
+        for size in SIZES:
+            values, counts = distribution(size)
+            below = counts.cumsum() - counts
+            ranks = (below + counts / 2) / counts.sum()
+            for table in (array('I', [len(values)]), array('I', [int(value) for value in values]),
+                          array('H', [int(round(rank * SCALE)) for rank in ranks])):
+                if sys.byteorder == 'big':
+                    table.byteswap()
+                table.tofile(table_file)
+            print('{}-card hands: {} hands, {} distinct values'.format(size, int(counts.sum()), len(values)))
+    print('Wrote', TABLE_FILENAME)
+
+
+def _read(table_file, typecode, count):
+    '''
+    Reads count little-endian items of an array type code.
+    '''
+    table = array(typecode)
+    table.fromfile(table_file, count)
+    if sys.byteorder == 'big':
+        table.byteswap()
+    return table
+
+
+def load_tables():
+    '''
+    Returns a dict from each card count in SIZES to its sorted values and their percentiles.
+    '''
+    result = {}
+    with open(TABLE_FILENAME, 'rb') as table_file:
+        for size in SIZES:
+            count = _read(table_file, 'I', 1)[0]
+            values = _read(table_file, 'I', count)
+            percentiles = _read(table_file, 'H', count)
+            result[size] = (values, [percentile / SCALE for percentile in percentiles])
+    return result
+
+
+TABLES = load_tables() if os.path.exists(TABLE_FILENAME) else None
+
+
+def percentile(value, size):
+    '''
+    Returns the fraction of hands of size cards that an eval7 value beats, ties counting half.
+    '''
+    values, percentiles = TABLES[size]
+    return percentiles[max(0, bisect_right(values, value) - 1)]
+
+
+def eval7_percentile(cards):
+    '''
+    Returns the percentile of a hand of 3, 5 or 7 eval7.Cards among all hands of as many cards,
+    e.g. of RoundState.eval7_hands[active] + RoundState.eval7_board.
+    '''
+    return percentile(eval7.evaluate(cards), len(cards))
+
+
+def hand_percentile(cards):
+    '''
+    Returns the percentile of a hand of 3, 5 or 7 card strings among all hands of as many cards.
+    '''
+    return eval7_percentile([EVAL7_CARDS[card] for card in cards])
+
+
+if __name__ == '__main__':
+    generate()
@@ -0,0 +1,219 @@
+'''
+Round-robin league with Glicko ratings and cached match results.
+
+Every match result is stored in the league file under the content hashes of both bots, so
+after editing one bot only the pairings involving that bot are played again. Ratings are
+rebuilt from the cached results at startup and updated as each new match finishes. Matches
+run on a process pool, and the next match always goes to the pairing whose ratings are the
+least certain.
+
+Example:
+    python league.py ./luckson ./equity ./test_bot ./all_in_bot ./python_skeleton --rounds 1000
+'''
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from itertools import combinations
+import argparse
+import json
+import math
+import os
+import random
+
+import engine
+from bracket import unique_names
+
+INITIAL_RATING = 1500.
+INITIAL_DEVIATION = 350.
+MIN_DEVIATION = 30.
+Q = math.log(10) / 400
+
+
+class Rating():
+    '''
+    A Glicko rating: an estimate of a bot's strength and the standard deviation of that estimate.
+    '''
+
+    def __init__(self):
+        self.rating = INITIAL_RATING
+        self.deviation = INITIAL_DEVIATION
+        self.wins = 0
+        self.losses = 0
+        self.chips = 0
+
+    def update(self, opponent, score):
+        '''
+        Updates the rating after one match against an opponent rated before the match.
+
+        Args:
+            opponent (tuple): The opponent's (rating, deviation) before the match.
+            score (float): 1 for a win, 0.5 for a tie, 0 for a loss.
+        '''
+        rating, deviation = opponent
+        g = 1 / math.sqrt(1 + 3 * (Q * deviation / math.pi) ** 2)
+        expected = 1 / (1 + 10 ** (-g * (self.rating - rating) / 400))
+        d_squared = 1 / (Q ** 2 * g ** 2 * expected * (1 - expected))
+        variance = 1 / (1 / self.deviation ** 2 + 1 / d_squared)
+        self.rating += Q * variance * g * (score - expected)
+        self.deviation = max(MIN_DEVIATION, math.sqrt(variance))
+
+
+class League():
+    '''
+    Schedules and caches the matches of a round-robin league between bot directories.
+    '''
+
+    def __init__(self, paths, games_per_pairing=2, league_filename='league.json',
+                 log_directory='league_logs', overrides=None):
+        self.paths = [os.path.abspath(path) for path in paths]
+        self.names = unique_names(paths)
+        self.hashes = [engine.bot_hash(path) for path in self.paths]
+        if len(set(self.hashes)) < len(self.hashes):
+            raise ValueError('two bot directories have identical contents')
+        self.games_per_pairing = games_per_pairing
+        self.league_filename = league_filename
+        self.log_directory = log_directory
+        self.overrides = overrides or {}
+        self.num_rounds = self.overrides.get('NUM_ROUNDS', engine.NUM_ROUNDS)
+        self.results = {}
+        if os.path.exists(league_filename):
+            with open(league_filename, 'r') as league_file:
+                self.results = json.load(league_file)['results']
+        self.ratings = [Rating() for _ in self.paths]
+        for key in self.results:
+            self.rate(key)
+
+    def match_key(self, first, second, game):
+        '''
+        Returns the cache key of one game between two bots, which are seated in hash order
+        in even games and swapped in odd games.
+        '''
+        hashes = sorted([self.hashes[first], self.hashes[second]])
+        return '{}:{}:{}:{}'.format(hashes[0], hashes[1], self.num_rounds, game)
+
+    def rate(self, key):
+        '''
+        Applies one cached result to the ratings if both of its bots are in this league.
+        '''
+        result = self.results[key]
+        if result['hashes'][0] not in self.hashes or result['hashes'][1] not in self.hashes:
+            return
+        bots = [self.hashes.index(bot_hash) for bot_hash in result['hashes']]
+        before = [(self.ratings[bot].rating, self.ratings[bot].deviation) for bot in bots]
+        for seat, bot in enumerate(bots):
+            mine, theirs = result['bankrolls'][seat], result['bankrolls'][1-seat]
+            rating = self.ratings[bot]
+            rating.update(before[1-seat], 1. if mine > theirs else 0. if mine < theirs else .5)
+            rating.wins += mine > theirs
+            rating.losses += mine < theirs
+            rating.chips += mine
+
+    def uncertainty(self, pairing, in_flight):
+        '''
+        Returns how much a match between two bots is expected to tighten the ratings, discounting
+        bots whose matches are already being played.
+        '''
+        return sum(self.ratings[bot].deviation ** 2 / (1 + in_flight[bot]) for bot in pairing)
+
+    def missing_games(self):
+        '''
+        Returns, for each pairing of bots, the games whose results are not cached yet.
+        '''
+        missing = {}
+        for pairing in combinations(range(len(self.paths)), 2):
+            games = [game for game in range(self.games_per_pairing)
+                     if self.match_key(pairing[0], pairing[1], game) not in self.results]
+            if games:
+                missing[pairing] = games
+        return missing
+
+    def game_spec(self, pairing, game):
+        '''
+        Returns the cache key, seating and play_match arguments for one game.
+        '''
+        key = self.match_key(pairing[0], pairing[1], game)
+        bots = sorted(pairing, key=lambda bot: self.hashes[bot])
+        if game % 2 == 1:
+            bots = bots[::-1]
+        players = [(self.names[bot], self.paths[bot]) for bot in bots]
+        log_filename = os.path.join(self.log_directory, '{}-{}-g{}'.format(players[0][0], players[1][0], game + 1),
+                                    'gamelog')
+        overrides = dict(self.overrides)
+        overrides['MATCH_SEED'] = random.Random(key).randrange(2**32)
+        return key, bots, players, log_filename, overrides
+
+    def save(self):
+        '''
+        Writes the cached results to the league file, replacing it atomically.
+        '''
+        temporary_filename = self.league_filename + '.tmp'
+        with open(temporary_filename, 'w') as league_file:
+            json.dump({'results': self.results}, league_file, indent=1)
+        os.replace(temporary_filename, self.league_filename)
+
+    def run(self, workers=None):
+        '''
+        Plays every uncached game, most uncertain pairing first, and prints the standings.
+        '''
+        missing = self.missing_games()
+        total = sum(len(games) for games in missing.values())
+        print('Playing', total, 'matches,', len(missing), 'pairings need results')
+        workers = workers or os.cpu_count()
+        pending = {}
+        in_flight = [0] * len(self.paths)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            while missing or pending:
+                while missing and len(pending) < workers:
+                    pairing = max(missing, key=lambda pairing: self.uncertainty(pairing, in_flight))
+                    game = missing[pairing].pop(0)
+                    if not missing[pairing]:
+                        del missing[pairing]
+                    key, bots, players, log_filename, overrides = self.game_spec(pairing, game)
+                    future = executor.submit(engine.play_match, players[0], players[1], log_filename, overrides)
+                    pending[future] = (key, bots)
+                    for bot in bots:
+                        in_flight[bot] += 1
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    key, bots = pending.pop(future)
+                    for bot in bots:
+                        in_flight[bot] -= 1
+                    result = future.result()
+                    self.results[key] = {'hashes': [self.hashes[bot] for bot in bots], 'names': result.names,
+                                         'bankrolls': result.bankrolls, 'seed': result.seed}
+                    self.rate(key)
+                    self.save()
+                    print('{} {:+d} vs {} {:+d}'.format(result.names[0], result.bankrolls[0],
+                                                        result.names[1], result.bankrolls[1]))
+        self.print_standings()
+
+    def print_standings(self):
+        '''
+        Prints the bots ordered by rating.
+        '''
+        print('{:<24} {:>7} {:>6} {:>9} {:>10}'.format('Bot', 'Rating', 'RD', 'W-L', 'Chips'))
+        for bot in sorted(range(len(self.paths)), key=lambda bot: -self.ratings[bot].rating):
+            rating = self.ratings[bot]
+            print('{:<24} {:>7.0f} {:>6.0f} {:>9} {:>+10d}'.format(
+                self.names[bot], rating.rating, rating.deviation,
+                '{}-{}'.format(rating.wins, rating.losses), rating.chips))
+
+
+def parse_args():
+    '''
+    Parses the league's command line.
+    '''
+    parser = argparse.ArgumentParser(prog='python league.py')
+    parser.add_argument('paths', nargs='+', help='Bot directories')
+    parser.add_argument('--games', type=int, default=2, help='Matches per pairing, seats alternate, defaults to 2')
+    parser.add_argument('--rounds', type=int, default=None, help='Rounds per match, defaults to NUM_ROUNDS')
+    parser.add_argument('--workers', type=int, default=None, help='Parallel matches, defaults to the CPU count')
+    parser.add_argument('--league-file', type=str, default='league.json', help='Cached results and ratings')
+    parser.add_argument('--log-dir', type=str, default='league_logs', help='Where to write the match logs')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    overrides = {'USE_ZYGOTES': True}
+    if args.rounds is not None:
+        overrides['NUM_ROUNDS'] = args.rounds
+    League(args.paths, args.games, args.league_file, args.log_dir, overrides).run(args.workers)
@@ -6,11 +6,31 @@ from skeleton.states import GameState, TerminalState, RoundState
 from skeleton.states import NUM_ROUNDS, STARTING_STACK, BIG_BLIND, SMALL_BLIND
 from skeleton.bot import Bot
 from skeleton.runner import parse_args, run_bot
-import eval7
+from skeleton.cards import eval7_cards
+from skeleton.strength import eval7_percentile
+from skeleton.params import load_params
+from skeleton.equity import BOARD_SIZE, EquitySession, clock_budget
+from skeleton.equity_cache import EquityCache
+from skeleton.preflop import preflop_equity
 import math
 import random
 
 
+# equities saved between matches, in the bot's directory; hidden files are state, not code, to
+# the engine's bot hashes
+EQUITY_CACHE_FILENAME = '.equity_cache.bin'
+# thresholds on hand strength and equity, raise sizes as fractions of the way from the minimum
+# to the maximum raise, and bluff and fold probabilities; tuner.py overrides them via params.json
+PARAMS = load_params({
+    'strong_strength': 0.7, 'strong_equity': 0.6, 'strong_raise': 1.0,
+    'good_strength': 0.5, 'good_equity': 0.5, 'good_raise': 1.0,
+    'decent_strength': 0.4, 'decent_equity': 0.4, 'decent_raise': 0.0,
+    'marginal_equity': 0.4, 'marginal_raise': 0.0,
+    'bluff_probability': 0.3, 'bluff_raise': 0.0,
+    'desperate_strength': 0.2, 'desperate_equity': 0.2, 'desperate_fold_probability': 0.1,
+})
+
+
 class Player(Bot):
     '''
     A pokerbot.
@@ -32,6 +52,7 @@ class Player(Bot):
             'confidence': 0.0,           # measure of how reliable opponent's actions are
             'current_round_actions': []  # track actions in current round
         }
+        self.equity_cache = EquityCache(filename=EQUITY_CACHE_FILENAME)
 
     def evaluate_hand_strength(self, cards):
         '''
@@ -43,7 +64,7 @@ class Player(Bot):
         Returns:
         str: 'strong', 'medium', or 'weak'
         '''
-        strength = self.evaluate_hand(cards)
+        strength = self.evaluate_hand(eval7_cards(cards))
         if strength > 0.7:
             return 'strong'
         elif strength > 0.4:
@@ -87,6 +108,23 @@ class Player(Bot):
         # Reset current round actions
         self.opponent_stats['current_round_actions'] = []
 
+    def handle_game_over(self):
+        '''
+        Called once when the match ends. Reports the equity cache's hit rate and saves it for
+        the next match.
+
+        Arguments:
+        Nothing.
+
+        Returns:
+        Nothing.
+        '''
+        print(self.equity_cache.summary())
+        try:
+            self.equity_cache.save()
+        except OSError as error:
+            print('Could not save the equity cache:', error)
+
     def handle_new_round(self, game_state, round_state, active):
         '''
         Called when a new round starts. Called NUM_ROUNDS times.
@@ -99,73 +137,20 @@ class Player(Bot):
         Returns:
         Nothing.
         '''
-        pass
+        self.equity_session = EquitySession(round_state.hands[active])
 
     def evaluate_hand(self, cards):
         '''
-        Evaluates the strength of a poker hand using eval7.
+        Evaluates the strength of a poker hand as its percentile among all hands of as many
+        cards, see skeleton/strength.py.
         
         Arguments:
-        cards: List of card strings (e.g., ['As', 'Ks', 'Qs', 'Js', '10s'])
+        cards: List of 3, 5 or 7 eval7.Cards (e.g., round_state.eval7_hands[active] + round_state.eval7_board)
         
         Returns:
-        float: Hand strength score (higher is better)
+        float: Hand strength from 0 to 1 (higher is better)
         '''
-        # Convert card strings to eval7 Card objects
-        eval7_cards = [eval7.Card(card) for card in cards]
-        # Evaluate the hand
-        return eval7.evaluate(eval7_cards)
-
-    def evaluate_opportunity(self, my_cards, board_cards, deck):
-        '''
-        Evaluates the strength of our hand against all possible opponent hands.
-        
-        Arguments:
-        board_cards: List of community cards
-        deck: List of remaining cards in the deck
-        
-        Returns:
-        float: Average hand strength against all possible opponent hands
-        '''
-        NTotal = 52
-        
-        # Create a set of all used cards (our cards + board cards)
-        used_cards = set(my_cards + board_cards)
-        
-        # Create a set of all remaining cards
-        remaining_cards = set(deck)
-        
-        # Calculate number of possible opponent hands
-        n_opponent_hands = 0
-        total_strength = 0
-        
-        # Iterate through all possible opponent hands
-        for card1 in remaining_cards:
-            for card2 in remaining_cards:
-                if card1 != card2:  # Ensure we don't use the same card twice
-                    # Create opponent's hand
-                    opp_hand = [card1, card2]
-                    
-                    # Evaluate our hand vs opponent's hand
-                    our_hand = my_cards + board_cards
-                    opp_hand_with_board = opp_hand + board_cards
-                    
-                    our_strength = self.evaluate_hand(our_hand)
-                    opp_strength = self.evaluate_hand(opp_hand_with_board)
-                    
-                    # Compare hands
-                    if our_strength > opp_strength:
-                        total_strength += 1
-                    elif our_strength == opp_strength:
-                        total_strength += 0.5
-                    
-                    n_opponent_hands += 1
-        
-        # Calculate equity (probability of winning)
-        if n_opponent_hands > 0:
-            equity = total_strength / n_opponent_hands
-            return equity
-        return 0.0  # Return 0 if no possible opponent hands
+        return eval7_percentile(cards)
 
     def get_action(self, game_state, round_state, active):
         '''
@@ -193,10 +178,15 @@ class Player(Bot):
         opp_contribution = STARTING_STACK - opp_stack
 
         # Evaluate current hand strength and equity
-        current_hand = my_cards + board_cards
-        hand_strength = self.evaluate_hand(current_hand)
-        equity = self.evaluate_opportunity(my_cards, board_cards, round_state.deck)
-        remaining_rounds = 5000 - game_state.round_num
+        hand_strength = self.evaluate_hand(round_state.eval7_hands[active] + round_state.eval7_board)
+        if street == 0:
+            equity = preflop_equity(my_cards)
+        elif street < BOARD_SIZE:
+            # the round's session tops up the samples of earlier decisions on this street
+            equity = self.equity_session.equity(my_cards, board_cards, clock_budget(game_state))
+        else:
+            equity = self.equity_cache.equity(my_cards, board_cards, clock_budget(game_state))
+        remaining_rounds = NUM_ROUNDS - game_state.round_num
 
         # Only fold if we're winning by a lot - instant win condition
         if game_state.bankroll > 0 and game_state.bankroll > ((remaining_rounds+1) * 7.5):
@@ -205,28 +195,30 @@ class Player(Bot):
         
         if RaiseAction in legal_actions:
             min_raise, max_raise = round_state.raise_bounds()
+            raise_to = lambda fraction: RaiseAction(min_raise + int(round(fraction * (max_raise - min_raise))))
             
             # Very strong hand with high equity
-            if hand_strength > 0.7 and equity > 0.6:
-                return RaiseAction(max_raise)
+            if hand_strength > PARAMS['strong_strength'] and equity > PARAMS['strong_equity']:
+                return raise_to(PARAMS['strong_raise'])
             # Strong hand with good equity
-            elif hand_strength > 0.5 and equity > 0.5:
-                return RaiseAction(max_raise)
+            elif hand_strength > PARAMS['good_strength'] and equity > PARAMS['good_equity']:
+                return raise_to(PARAMS['good_raise'])
             # Decent hand with good equity
-            elif hand_strength > 0.4 and equity > 0.4:
-                return RaiseAction(min_raise)
+            elif hand_strength > PARAMS['decent_strength'] and equity > PARAMS['decent_equity']:
+                return raise_to(PARAMS['decent_raise'])
             # Marginal hand but decent equity
-            elif equity > 0.4:
-                return RaiseAction(min_raise)
+            elif equity > PARAMS['marginal_equity']:
+                return raise_to(PARAMS['marginal_raise'])
             # More frequent bluffs
-            elif random.random() < 0.3:
-                return RaiseAction(min_raise)
+            elif random.random() < PARAMS['bluff_probability']:
+                return raise_to(PARAMS['bluff_raise'])
         
         if CheckAction in legal_actions:
             return CheckAction()
             
         # Only fold in absolutely desperate situations
-        if hand_strength < 0.2 and equity < 0.2 and random.random() < 0.1:
+        if (hand_strength < PARAMS['desperate_strength'] and equity < PARAMS['desperate_equity']
+                and random.random() < PARAMS['desperate_fold_probability']):
             return FoldAction()
             
         return CallAction()  # Default to calling with decent hands
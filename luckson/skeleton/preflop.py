@@ -0,0 +1,129 @@
+'''
+Precomputed preflop equities of all B4G Hold'em starting hands.
+
+The 22,100 possible 3-card starting hands fall into 1,755 classes that differ only by a
+permutation of suits, numbered by isomorphism.PREFLOP. For every class the table holds its
+equity against a random 3-card hand over the full 4-card board, and its percentile: the fraction
+of all 22,100 starting hands with lower equity, counting ties as half. Both are stored as uint16
+in preflop.dat, next to this file, in class index order.
+
+The table is generated offline, on a process pool, with
+    python -m skeleton.preflop --samples 20000
+run from a bot directory, and then copied to the other bots' skeletons.
+'''
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+import argparse
+import os
+import random
+import sys
+
+from .equity import monte_carlo_equity
+from .isomorphism import PREFLOP
+
+TABLE_FILENAME = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'preflop.dat')
+SCALE = 65535
+
+
+def class_equity(task):
+    '''
+    Pool task: the Monte Carlo equity of one starting hand class.
+    '''
+    index, samples, seed = task
+    return monte_carlo_equity(PREFLOP.unindex(index)[0], [], target_error=0., time_budget=float('inf'),
+                              max_samples=samples, rng=random.Random(seed)).equity
+
+
+def class_sizes():
+    '''
+    Returns the number of starting hands in every class.
+    '''
+    counts = [0] * PREFLOP.size
+    for hand in combinations(range(52), 3):
+        counts[PREFLOP.index(hand)] += 1
+    return counts
+
+
+def percentiles(equities, counts):
+    '''
+    Returns for every class the fraction of all starting hands with lower equity, ties counting half.
+    '''
+    total = sum(counts)
+    order = sorted(range(len(equities)), key=lambda i: equities[i])
+    result = [0.] * len(equities)
+    below = 0
+    start = 0
+    while start < len(order):
+        end = start
+        while end < len(order) and equities[order[end]] == equities[order[start]]:
+            end += 1
+        tied = sum(counts[i] for i in order[start:end])
+        for i in order[start:end]:
+            result[i] = (below + tied / 2) / total
+        below += tied
+        start = end
+    return result
+
+
+def generate(samples, workers=None, seed=0):
+    '''
+    Computes the table on a process pool and writes it to TABLE_FILENAME.
+    '''
+    tasks = [(index, samples, '{}-{}'.format(seed, index)) for index in range(PREFLOP.size)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        equities = list(executor.map(class_equity, tasks, chunksize=16))
+    # quantize before ranking so that percentiles agree with the stored equities
+    quantized = [int(round(equity * SCALE)) for equity in equities]
+    ranks = percentiles(quantized, class_sizes())
+    table = array('H', quantized + [int(round(rank * SCALE)) for rank in ranks])
+    if sys.byteorder == 'big':
+        table.byteswap()
+    with open(TABLE_FILENAME, 'wb') as table_file:
+        table.tofile(table_file)
+    print('Wrote', PREFLOP.size, 'starting hand classes to', TABLE_FILENAME)
+
+
+def load_table():
+    '''
+    Returns the (equity, percentile) of every class, by class index.
+    '''
+    table = array('H')
+    with open(TABLE_FILENAME, 'rb') as table_file:
+        table.fromfile(table_file, 2 * PREFLOP.size)
+    if sys.byteorder == 'big':
+        table.byteswap()
+    return [(table[i] / SCALE, table[PREFLOP.size + i] / SCALE) for i in range(PREFLOP.size)]
+
+
+TABLE = load_table() if os.path.exists(TABLE_FILENAME) else None
+
+
+def preflop_equity(my_cards):
+    '''
+    Returns the equity of 3 hole cards against a random hand over a full board.
+    '''
+    return TABLE[PREFLOP.index(my_cards)][0]
+
+
+def preflop_percentile(my_cards):
+    '''
+    Returns the fraction of starting hands weaker than the given 3 hole cards.
+    '''
+    return TABLE[PREFLOP.index(my_cards)][1]
+
+
+def in_top(my_cards, fraction):
+    '''
+    Returns True if the hole cards are among the best fraction of starting hands.
+    '''
+    return preflop_percentile(my_cards) >= 1 - fraction
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog='python -m skeleton.preflop')
+    parser.add_argument('--samples', type=int, default=20000, help='Samples per starting hand class')
+    parser.add_argument('--workers', type=int, default=None, help='Processes, defaults to the CPU count')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the samples')
+    args = parser.parse_args()
+    generate(args.samples, args.workers, args.seed)
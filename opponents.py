@@ -0,0 +1,351 @@
+'''
+Reference opponents that play in the same process as the bot being benchmarked.
+
+The opponents take decisions in microseconds and need no subprocess or socket. play_match runs
+a match between two in-process seats with the engine's RoundState, dealing from the engine's
+seeded decks, and gauntlet imports one bot directory into this process and plays it against
+each opponent in turn.
+
+Opponents see the engine's RoundState with hidden cards removed and the board as card strings,
+and answer with the engine's action types. Imported bots see their own skeleton's states and
+answer with their own skeleton's actions, as they would over a socket. RoundStates handed to
+bots have no previous_state.
+
+Example:
+    python opponents.py ./luckson --rounds 1000
+    python opponents.py ./equity --opponents station,tag --replay gamelog.txt:luckson
+'''
+from bisect import bisect_left
+from collections import namedtuple
+from itertools import combinations
+from types import SimpleNamespace
+import argparse
+import os
+import random
+import time
+
+import eval7
+
+import engine
+from engine import FoldAction, CallAction, CheckAction, RaiseAction
+from decisions import import_bot, parse_log
+
+GameState = namedtuple('GameState', ['bankroll', 'game_clock', 'round_num'])
+# the state and action types opponents are handed
+OPPONENT_STATES = SimpleNamespace(GameState=GameState, RoundState=engine.RoundState, TerminalState=engine.TerminalState)
+OPPONENT_ACTIONS = SimpleNamespace(FoldAction=FoldAction, CallAction=CallAction, CheckAction=CheckAction,
+                                   RaiseAction=RaiseAction)
+ENGINE_ACTIONS = {'FoldAction': FoldAction, 'CallAction': CallAction, 'CheckAction': CheckAction,
+                  'RaiseAction': RaiseAction}
+CARDS = {str(card): card for card in eval7.Deck().cards}
+RANKS = '23456789TJQKA'
+
+
+class Opponent():
+    '''
+    Base class of the reference opponents, which ignore the start and end of rounds.
+    '''
+    name = 'opponent'
+
+    def handle_new_round(self, game_state, round_state, active):
+        pass
+
+    def handle_round_over(self, game_state, terminal_state, active):
+        pass
+
+    def get_action(self, game_state, round_state, active):
+        raise NotImplementedError('get_action')
+
+
+def passive(legal_actions):
+    '''
+    Returns CheckAction if it is legal, otherwise CallAction.
+    '''
+    return CheckAction() if CheckAction in legal_actions else CallAction()
+
+
+class RandomOpponent(Opponent):
+    '''
+    Picks a legal action uniformly at random, and a raise size uniformly within the bounds.
+    '''
+    name = 'random'
+
+    def __init__(self, seed=0):
+        self.random = random.Random(seed)
+
+    def get_action(self, game_state, round_state, active):
+        action = self.random.choice(sorted(round_state.legal_actions(), key=lambda action: action.__name__))
+        if action is RaiseAction:
+            return RaiseAction(self.random.randint(*round_state.raise_bounds()))
+        return action()
+
+
+class CallingStation(Opponent):
+    '''
+    Never folds and never raises.
+    '''
+    name = 'station'
+
+    def get_action(self, game_state, round_state, active):
+        return passive(round_state.legal_actions())
+
+
+class MaxRaiser(Opponent):
+    '''
+    Raises the maximum whenever it can, and otherwise calls or checks.
+    '''
+    name = 'maxraise'
+
+    def get_action(self, game_state, round_state, active):
+        legal_actions = round_state.legal_actions()
+        if RaiseAction in legal_actions:
+            return RaiseAction(round_state.raise_bounds()[1])
+        return passive(legal_actions)
+
+
+class FoldToRaise(Opponent):
+    '''
+    Checks and calls the blinds, but folds to any bet or raise.
+    '''
+    name = 'foldtoraise'
+
+    def get_action(self, game_state, round_state, active):
+        legal_actions = round_state.legal_actions()
+        facing_raise = round_state.pips[1-active] > (engine.BIG_BLIND if round_state.street == 0 else 0)
+        if facing_raise:
+            return FoldAction()
+        return passive(legal_actions)
+
+
+def preflop_score(cards):
+    '''
+    Returns a rough strength score of 3 hole cards: high cards, pairs, suits and connectedness.
+    '''
+    ranks = sorted((RANKS.index(card[0]) for card in cards), reverse=True)
+    suits = len(set(card[1] for card in cards))
+    score = 4 * ranks[0] + 2 * ranks[1] + ranks[2]
+    if ranks[0] == ranks[2]:
+        score += 80
+    elif ranks[0] == ranks[1] or ranks[1] == ranks[2]:
+        score += 40
+    score += {1: 10, 2: 6, 3: 0}[suits]
+    if ranks[0] - ranks[2] <= 4 and len(set(ranks)) == 3:
+        score += 5
+    return score
+
+
+class TightAggressive(Opponent):
+    '''
+    Plays only the top fraction of starting hands by preflop_score, raising them preflop.
+    After the flop it raises when its hole cards make two pair or better, calls with a pair,
+    and otherwise checks or folds.
+    '''
+    name = 'tag'
+    scores = None
+
+    def __init__(self, top_fraction=0.25):
+        self.top_fraction = top_fraction
+        if TightAggressive.scores is None:
+            TightAggressive.scores = sorted(preflop_score(hand) for hand in combinations(CARDS, 3))
+
+    def percentile(self, cards):
+        '''
+        Returns the fraction of starting hands that score below the given hole cards.
+        '''
+        return bisect_left(self.scores, preflop_score(cards)) / len(self.scores)
+
+    def get_action(self, game_state, round_state, active):
+        legal_actions = round_state.legal_actions()
+        my_cards = round_state.hands[active]
+        if round_state.street == 0:
+            if self.percentile(my_cards) < 1 - self.top_fraction:
+                return CheckAction() if CheckAction in legal_actions else FoldAction()
+            if RaiseAction in legal_actions:
+                return RaiseAction(round_state.raise_bounds()[0])
+            return passive(legal_actions)
+        board = [CARDS[card] for card in round_state.deck]
+        made = eval7.evaluate([CARDS[card] for card in my_cards] + board) >> 24
+        # only count what the hole cards add to the board
+        if made <= eval7.evaluate(board) >> 24:
+            made = 0
+        if made >= 2 and RaiseAction in legal_actions:
+            min_raise, max_raise = round_state.raise_bounds()
+            pot = sum(engine.STARTING_STACK - stack for stack in round_state.stacks)
+            return RaiseAction(max(min_raise, min(max_raise, round_state.pips[active] + pot)))
+        if made >= 1:
+            return passive(legal_actions)
+        return CheckAction() if CheckAction in legal_actions else FoldAction()
+
+
+class ReplayOpponent(Opponent):
+    '''
+    Replays the actions one player took in a game log, round by round. When the game has moved
+    away from the log the logged action may not fit; a logged raise is then clamped to the
+    legal bounds, and anything else illegal or missing becomes a check or call.
+    '''
+    name = 'replay'
+
+    def __init__(self, log_filename, player_name):
+        self.name = 'replay-' + player_name
+        self.rounds = {}
+        with open(log_filename, 'r') as log_file:
+            for record in parse_log(log_file):
+                if player_name in record['names']:
+                    seat = record['names'].index(player_name)
+                    self.rounds[record['round']] = [code for actor, code in record['actions'] if actor == seat]
+        self.queue = []
+
+    def handle_new_round(self, game_state, round_state, active):
+        self.queue = list(self.rounds.get(game_state.round_num, []))
+
+    def get_action(self, game_state, round_state, active):
+        legal_actions = round_state.legal_actions()
+        if self.queue:
+            code = self.queue.pop(0)
+            action = engine.DECODE[code[0]]
+            if action is RaiseAction and action in legal_actions:
+                min_raise, max_raise = round_state.raise_bounds()
+                return RaiseAction(max(min_raise, min(max_raise, int(code[1:]))))
+            if action in legal_actions and action is not RaiseAction:
+                return action()
+        return passive(legal_actions)
+
+
+OPPONENTS = {opponent.name: opponent for opponent in (RandomOpponent, CallingStation, MaxRaiser, FoldToRaise,
+                                                       TightAggressive)}
+
+
+class Seat():
+    '''
+    A pokerbot playing in this process, with the state and action types it understands.
+    '''
+
+    def __init__(self, name, pokerbot, states, actions):
+        self.name = name
+        self.pokerbot = pokerbot
+        self.states = states
+        self.actions = actions
+        self.bankroll = 0
+        self.decisions = 0
+        self.seconds = 0.
+
+    def view(self, round_state, active, cards, reveal=False):
+        '''
+        Returns the RoundState this seat sees, in its own types, with card strings.
+        '''
+        hands = [cards[0], cards[1]] if reveal else [[], []]
+        hands[active] = cards[active]
+        return self.states.RoundState(round_state.button, round_state.street, round_state.pips, round_state.stacks,
+                                      hands, cards[2][:round_state.street], None)
+
+    def query(self, game_state, round_state, active, cards):
+        '''
+        Asks the pokerbot for an action, timing it, and returns it as a legal engine action.
+        '''
+        start_time = time.perf_counter()
+        action = self.pokerbot.get_action(game_state, self.view(round_state, active, cards), active)
+        self.seconds += time.perf_counter() - start_time
+        self.decisions += 1
+        legal_actions = round_state.legal_actions()
+        action_type = ENGINE_ACTIONS.get(type(action).__name__)
+        if action_type in legal_actions:
+            if action_type is not RaiseAction:
+                return action_type()
+            min_raise, max_raise = round_state.raise_bounds()
+            if min_raise <= action.amount <= max_raise:
+                return RaiseAction(action.amount)
+        return CheckAction() if CheckAction in legal_actions else FoldAction()
+
+
+def play_round(players, round_num, seed):
+    '''
+    Plays one round between two seats in small blind, big blind order and returns the deltas.
+    '''
+    deck = engine.shuffled_deck(seed, round_num)
+    hands = [deck.deal(3), deck.deal(3)]
+    cards = [[str(card) for card in hands[0]], [str(card) for card in hands[1]],
+             [str(card) for card in deck.peek(4)]]
+    round_state = engine.RoundState(0, 0, [engine.SMALL_BLIND, engine.BIG_BLIND],
+                                    [engine.STARTING_STACK - engine.SMALL_BLIND,
+                                     engine.STARTING_STACK - engine.BIG_BLIND], hands, deck, None)
+    game_states = [player.states.GameState(player.bankroll, engine.STARTING_GAME_CLOCK, round_num)
+                   for player in players]
+    for active, player in enumerate(players):
+        if not isinstance(player.pokerbot, Opponent):
+            random.seed(engine.bot_seed(seed, round_num, player.name))
+        player.pokerbot.handle_new_round(game_states[active], player.view(round_state, active, cards), active)
+    action = None
+    while not isinstance(round_state, engine.TerminalState):
+        active = round_state.button % 2
+        if engine.AUTO_RUNOUT and round_state.betting_closed():
+            action = CheckAction()
+        else:
+            action = players[active].query(game_states[active], round_state, active, cards)
+        round_state = round_state.proceed(action)
+    showdown = not isinstance(action, FoldAction)
+    for active, player in enumerate(players):
+        player.bankroll += round_state.deltas[active]
+        game_state = player.states.GameState(player.bankroll, engine.STARTING_GAME_CLOCK, round_num)
+        previous_state = player.view(round_state.previous_state, active, cards, showdown)
+        terminal_state = player.states.TerminalState(round_state.deltas, previous_state)
+        player.pokerbot.handle_round_over(game_state, terminal_state, active)
+    return round_state.deltas
+
+
+def play_match(player_1, player_2, num_rounds=engine.NUM_ROUNDS, seed=0):
+    '''
+    Plays a match between two seats, alternating the blinds, and returns the per-round deltas
+    in [player 1, player 2] order.
+    '''
+    deltas = []
+    for round_num in range(1, num_rounds + 1):
+        if round_num % 2 == 1:
+            deltas.append(play_round([player_1, player_2], round_num, seed))
+        else:
+            deltas.append(play_round([player_2, player_1], round_num, seed)[::-1])
+    return deltas
+
+
+def gauntlet(path, opponents, num_rounds=engine.NUM_ROUNDS, seed=0):
+    '''
+    Imports a bot directory and plays it against each opponent in turn, printing the results.
+    '''
+    name = os.path.basename(os.path.normpath(path))
+    player, actions, states = import_bot(path)
+    print('{:<16} {:>9} {:>10} {:>13} {:>13} {:>8}'.format(
+        'Opponent', 'Bankroll', 'mbb/hand', 'Bot us/dec', 'Opp us/dec', 'Time s'))
+    for opponent in opponents:
+        bot = Seat(name, player.Player(), states, actions)
+        rival = Seat(opponent.name, opponent, OPPONENT_STATES, OPPONENT_ACTIONS)
+        start_time = time.perf_counter()
+        play_match(bot, rival, num_rounds, seed)
+        print('{:<16} {:>+9d} {:>+10.1f} {:>13.1f} {:>13.1f} {:>8.2f}'.format(
+            opponent.name, bot.bankroll, bot.bankroll * 1000. / engine.BIG_BLIND / num_rounds,
+            bot.seconds / max(1, bot.decisions) * 1e6, rival.seconds / max(1, rival.decisions) * 1e6,
+            time.perf_counter() - start_time))
+
+
+def parse_args():
+    '''
+    Parses the gauntlet's command line.
+    '''
+    parser = argparse.ArgumentParser(prog='python opponents.py')
+    parser.add_argument('path', type=str, help='Bot directory to benchmark')
+    parser.add_argument('--opponents', type=str, default=','.join(OPPONENTS),
+                        help='Comma-separated opponents, defaults to ' + ','.join(OPPONENTS))
+    parser.add_argument('--replay', type=str, action='append', default=[],
+                        help='LOG:NAME, replay the actions of player NAME in game log LOG')
+    parser.add_argument('--rounds', type=int, default=engine.NUM_ROUNDS, help='Rounds per match')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the decks and of the random opponent')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    opponents = []
+    for opponent_name in filter(None, args.opponents.split(',')):
+        opponents.append(RandomOpponent(args.seed) if opponent_name == 'random' else OPPONENTS[opponent_name]())
+    for replay in args.replay:
+        log_filename, player_name = replay.rsplit(':', 1)
+        opponents.append(ReplayOpponent(os.path.abspath(log_filename), player_name))
+    gauntlet(args.path, opponents, args.rounds, args.seed)
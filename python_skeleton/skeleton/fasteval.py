@@ -0,0 +1,214 @@
+'''
+Batched hand evaluation with NumPy.
+
+A hand of up to 7 cards is a 64-bit mask with one bit per card, at bit 16 * suit + rank, so the
+13-bit rank mask of every suit can be read off with a shift. evaluate scores a whole array of such
+masks in one call with a handful of array operations and lookups in 13-bit tables, and returns
+exactly the values eval7.evaluate would: higher is better and equal values tie.
+
+Cards are card strings such as 'Ah', or codes rank * 4 + suit with ranks 2..A as 0..12 and
+suits c, d, h, s as 0..3.
+
+Running
+    python -m skeleton.fasteval
+from a bot directory compares evaluate with eval7 on every distinct hand of 3 to 7 cards.
+'''
+from itertools import combinations, combinations_with_replacement
+import argparse
+import time
+
+import numpy as np
+
+from .cards import CODES, EVAL7_CARDS, NAMES
+
+NUM_RANKS = 13
+NUM_SUITS = 4
+SUIT_SHIFT = 16
+RANK_MASK = (1 << NUM_RANKS) - 1
+
+# hand types, as in eval7
+HIGH_CARD = 0
+PAIR = 1 << 24
+TWO_PAIR = 2 << 24
+TRIPS = 3 << 24
+STRAIGHT = 4 << 24
+FLUSH = 5 << 24
+FULL_HOUSE = 6 << 24
+QUADS = 7 << 24
+STRAIGHT_FLUSH = 8 << 24
+
+# the fasteval mask of every card code
+MASKS = np.array([1 << (SUIT_SHIFT * (code & 3) + (code >> 2)) for code in range(52)], dtype=np.uint64)
+
+
+def _top_ranks(mask):
+    '''
+    Returns the 5 highest ranks of a rank mask as nibbles, the highest at bit 16.
+    '''
+    value = 0
+    shift = 16
+    for rank in range(NUM_RANKS - 1, -1, -1):
+        if mask >> rank & 1 and shift >= 0:
+            value |= rank << shift
+            shift -= 4
+    return value
+
+
+def _straight_top(mask):
+    '''
+    Returns the top rank of the highest straight in a rank mask, with A-2-3-4-5 topped by the 5,
+    or -1.
+    '''
+    # the ace also plays below the 2
+    wheel = mask << 1 | mask >> (NUM_RANKS - 1)
+    for top in range(NUM_RANKS, 3, -1):
+        if wheel >> (top - 4) & 0x1f == 0x1f:
+            return top - 1
+    return -1
+
+
+def _tables():
+    '''
+    Returns the lookup tables over all 13-bit rank masks.
+    '''
+    top = np.zeros(1 << NUM_RANKS, dtype=np.int32)
+    straight = np.zeros(1 << NUM_RANKS, dtype=np.int32)
+    flush = np.zeros(1 << NUM_RANKS, dtype=np.int32)
+    highest = np.zeros(1 << NUM_RANKS, dtype=np.int32)
+    popcount = np.zeros(1 << NUM_RANKS, dtype=np.int32)
+    for mask in range(1 << NUM_RANKS):
+        top[mask] = _top_ranks(mask)
+        straight_top = _straight_top(mask)
+        straight[mask] = STRAIGHT | straight_top << 16 if straight_top >= 0 else 0
+        popcount[mask] = bin(mask).count('1')
+        if popcount[mask] >= 5:
+            flush[mask] = STRAIGHT_FLUSH | straight_top << 16 if straight_top >= 0 else FLUSH | top[mask]
+        highest[mask] = 1 << (mask.bit_length() - 1) if mask else 0
+    return top, straight, flush, highest, popcount
+
+
+# TOP: the 5 highest ranks as nibbles; STRAIGHTS and FLUSHES: the straight and flush values of a
+# mask, 0 if none; HIGHEST: the highest bit; POPCOUNT: the number of bits
+TOP, STRAIGHTS, FLUSHES, HIGHEST, POPCOUNT = _tables()
+
+
+def hand_mask(cards):
+    '''
+    Returns the mask of a hand, given as card strings or codes.
+    '''
+    mask = 0
+    for card in cards:
+        mask |= int(MASKS[card if isinstance(card, int) else CODES[card]])
+    return mask
+
+
+def hand_masks(codes):
+    '''
+    Returns the masks of an (n, cards) integer array of card codes as an array of n uint64.
+    '''
+    return np.bitwise_or.reduce(MASKS[np.asarray(codes)], axis=-1)
+
+
+def evaluate(masks):
+    '''
+    Returns the eval7 values of an array of hand masks of 3 to 7 cards, as int32.
+    '''
+    masks = np.asarray(masks, dtype=np.uint64)
+    suits = [((masks >> np.uint64(SUIT_SHIFT * suit)) & np.uint64(RANK_MASK)).astype(np.int32)
+             for suit in range(NUM_SUITS)]
+    clubs, diamonds, hearts, spades = suits
+    # ranks held at least once, twice, three and four times
+    once = clubs | diamonds | hearts | spades
+    twice = (clubs & diamonds) | (hearts & spades) | ((clubs | diamonds) & (hearts | spades))
+    thrice = (clubs & diamonds & (hearts | spades)) | (hearts & spades & (clubs | diamonds))
+    four = clubs & diamonds & hearts & spades
+    pairs = POPCOUNT[twice]
+    # the best pair beside the best trips makes a full house, so does a second trips
+    best_trips = HIGHEST[thrice]
+    top_pairs = HIGHEST[twice] | HIGHEST[twice & ~HIGHEST[twice]]
+    value = np.select(
+        [four != 0,
+         (thrice != 0) & (pairs >= 2),
+         STRAIGHTS[once] != 0,
+         thrice != 0,
+         pairs >= 2,
+         pairs == 1],
+        [QUADS | TOP[four] & 0xf0000 | TOP[once & ~four] >> 4 & 0xf000,
+         FULL_HOUSE | TOP[thrice] & 0xf0000 | TOP[twice & ~best_trips] >> 4 & 0xf000,
+         STRAIGHTS[once],
+         TRIPS | TOP[thrice] & 0xf0000 | TOP[once & ~thrice] >> 4 & 0xff00,
+         TWO_PAIR | TOP[twice] & 0xff000 | TOP[once & ~top_pairs] >> 8 & 0xf00,
+         PAIR | TOP[twice] & 0xf0000 | TOP[once & ~twice] >> 4 & 0xfff0],
+        TOP[once])
+    # a flush beats everything a hand of at most 7 cards can make beside it, except a straight
+    # flush, and only one suit can hold 5 of them
+    flushes = np.maximum(np.maximum(FLUSHES[clubs], FLUSHES[diamonds]), np.maximum(FLUSHES[hearts], FLUSHES[spades]))
+    return np.maximum(value, flushes)
+
+
+def _distinct_hands(size):
+    '''
+    Yields one hand, as card codes, per distinct input of evaluate: every multiset of ranks dealt
+    without a flush, and every flush suit holding with every multiset of the other cards' ranks.
+    '''
+    for ranks in combinations_with_replacement(range(NUM_RANKS), size):
+        if max(ranks.count(rank) for rank in set(ranks)) <= NUM_SUITS:
+            # cycling through the suits over the sorted ranks gives every suit at most 2 cards
+            yield [4 * rank + i % NUM_SUITS for i, rank in enumerate(ranks)]
+    for flush_size in range(5, size + 1):
+        for flush_ranks in combinations(range(NUM_RANKS), flush_size):
+            for ranks in combinations_with_replacement(range(NUM_RANKS), size - flush_size):
+                if all(ranks.count(rank) <= NUM_SUITS - 1 for rank in ranks):
+                    yield [4 * rank for rank in flush_ranks] + [4 * rank + 1 + i % 3 for i, rank in enumerate(ranks)]
+
+
+def verify():
+    '''
+    Compares evaluate with eval7.evaluate on every distinct hand of 3 to 7 cards and prints
+    the number of hands and mismatches. Returns True if there are none.
+    '''
+    import eval7
+    cards = [EVAL7_CARDS[name] for name in NAMES]
+    mismatches = 0
+    for size in range(3, 8):
+        hands = list(_distinct_hands(size))
+        values = evaluate(hand_masks(hands))
+        expected = np.array([eval7.evaluate([cards[code] for code in hand]) for hand in hands], dtype=np.int32)
+        wrong = np.flatnonzero(values != expected)
+        for i in wrong[:5]:
+            print('  {}: {:#x} instead of {:#x}'.format(' '.join(str(cards[code]) for code in hands[i]),
+                                                      values[i], expected[i]))
+        print('{} distinct {}-card hands, {} mismatches'.format(len(hands), size, len(wrong)))
+        mismatches += len(wrong)
+    return mismatches == 0
+
+
+def benchmark(repeats=20):
+    '''
+    Prints the time to evaluate every opponent hand on one board with evaluate and with eval7.
+    '''
+    import eval7
+    codes = list(range(52))
+    board = codes[:4]
+    opponent_hands = np.array([hand + tuple(board) for hand in combinations(codes[7:], 3)])
+    start = time.perf_counter()
+    for _ in range(repeats):
+        evaluate(hand_masks(opponent_hands))
+    batched = (time.perf_counter() - start) / repeats
+    cards = [[EVAL7_CARDS[NAMES[code]] for code in hand] for hand in opponent_hands]
+    start = time.perf_counter()
+    for hand in cards:
+        eval7.evaluate(hand)
+    single = time.perf_counter() - start
+    print('{} hands: {:.2f} ms batched, {:.2f} ms with eval7'.format(len(opponent_hands), 1000 * batched,
+                                                                    1000 * single))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog='python -m skeleton.fasteval')
+    parser.add_argument('--benchmark', action='store_true', help='Also time a board of opponent hands')
+    args = parser.parse_args()
+    ok = verify()
+    if args.benchmark:
+        benchmark()
+    raise SystemExit(0 if ok else 1)
@@ -0,0 +1,201 @@
+'''
+Win-rate statistics over the per-round results of many matches.
+
+A bot's results are held as two (matches x rounds) NumPy arrays: its chip delta in every round,
+NaN past the end of shorter matches, and whether it posted the small blind. Win rates are
+reported in milli-big-blinds per hand (mbb/hand), with two 95% confidence intervals:
+
+- batch means: rounds are cut into batches of consecutive rounds whose means are treated as
+  independent, which absorbs short-range dependence such as an opponent adapting;
+- bootstrap: matches (or batches, for a single match) are resampled with replacement, all
+  resamples at once as one array operation.
+
+Rounds that EARLY_TERMINATION settles instead of playing are left out, so a match that was
+decided early counts only its played rounds.
+
+Example:
+    python stats.py luckson gamelog.txt league_logs/*/gamelog.txt
+'''
+from collections import namedtuple
+from statistics import NormalDist
+import argparse
+
+import numpy as np
+
+import engine
+from decisions import parse_log
+
+MAX_RESAMPLE_CELLS = 2**22
+
+Interval = namedtuple('Interval', ['mean', 'low', 'high'])
+
+
+def from_results(results, name):
+    '''
+    Returns the deltas and small-blind arrays of one bot from a list of engine.MatchResults.
+    Player 1 posts the small blind in the first round of a match.
+    '''
+    rows = []
+    for result in results:
+        index = result.names.index(name)
+        rows.append([deltas[index] for deltas in result.deltas[:len(result.deltas) - result.forfeited_rounds]])
+    return stack_rows(rows, [result.names.index(name) == 0 for result in results])
+
+
+def read_log(log_file, name):
+    '''
+    Returns (deltas, small blind flags, opponent name) for one bot from the played rounds of one
+    game log.
+    '''
+    deltas = []
+    small_blinds = []
+    opponent = None
+    for record in parse_log(log_file):
+        if name not in record['names']:
+            break
+        seat = record['names'].index(name)
+        opponent = record['names'][1-seat]
+        deltas.append(record['deltas'][seat])
+        small_blinds.append(seat == 0)
+    return deltas, small_blinds, opponent
+
+
+def from_logs(log_filenames, name):
+    '''
+    Returns, per opponent, the deltas and small-blind arrays of one bot from game logs.
+    '''
+    matches = {}
+    for log_filename in log_filenames:
+        with open(log_filename, 'r') as log_file:
+            deltas, small_blinds, opponent = read_log(log_file, name)
+        if deltas:
+            matches.setdefault(opponent, ([], []))
+            matches[opponent][0].append(deltas)
+            matches[opponent][1].append(small_blinds)
+    return {opponent: stack_rows(rows, flags) for opponent, (rows, flags) in matches.items()}
+
+
+def stack_rows(rows, small_blinds):
+    '''
+    Packs per-match lists into the (matches x rounds) delta and small-blind arrays, padding
+    shorter matches with NaN. small_blinds holds either a flag per round or, per match, whether
+    the bot posted the small blind in the first round.
+    '''
+    num_rounds = max(len(row) for row in rows)
+    deltas = np.full((len(rows), num_rounds), np.nan)
+    small_blind = np.zeros((len(rows), num_rounds), dtype=bool)
+    alternating = np.arange(num_rounds) % 2 == 0
+    for match, (row, flags) in enumerate(zip(rows, small_blinds)):
+        deltas[match, :len(row)] = row
+        if isinstance(flags, (bool, np.bool_)):
+            small_blind[match] = alternating if flags else ~alternating
+        else:
+            small_blind[match, :len(flags)] = flags
+    return deltas, small_blind
+
+
+def mbb(chips):
+    '''
+    Converts chips per hand to milli-big-blinds per hand.
+    '''
+    return chips * 1000. / engine.BIG_BLIND
+
+
+def batch_means(deltas, batch_size, mask=None):
+    '''
+    Returns the means of consecutive batches of rounds of every match, dropping partial batches.
+    If a mask is given, only the masked rounds of each batch are averaged.
+    '''
+    num_batches = deltas.shape[1] // batch_size
+    shape = (deltas.shape[0] * num_batches, batch_size)
+    batches = deltas[:, :num_batches * batch_size].reshape(shape)
+    complete = ~np.isnan(batches).any(axis=1)
+    if mask is None:
+        return batches[complete].mean(axis=1)
+    mask = mask[:, :num_batches * batch_size].reshape(shape)
+    counts = mask.sum(axis=1)
+    complete &= counts > 0
+    return np.where(mask, batches, 0.).sum(axis=1)[complete] / counts[complete]
+
+
+def batch_means_interval(deltas, batch_size=100, confidence=0.95, mask=None):
+    '''
+    Returns the win rate in mbb/hand and its normal confidence interval from batch means.
+    '''
+    means = batch_means(deltas, batch_size, mask)
+    mean = np.nanmean(deltas if mask is None else deltas[mask])
+    if len(means) < 2:
+        return Interval(mbb(mean), np.nan, np.nan)
+    error = NormalDist().inv_cdf(0.5 + confidence / 2) * means.std(ddof=1) / np.sqrt(len(means))
+    return Interval(mbb(mean), mbb(mean - error), mbb(mean + error))
+
+
+def bootstrap_interval(deltas, resamples=2000, batch_size=100, confidence=0.95, seed=0):
+    '''
+    Returns the win rate in mbb/hand and its percentile bootstrap confidence interval.
+
+    Whole matches are resampled, weighted by their number of rounds. With a single match, its
+    batches of batch_size rounds are resampled instead.
+    '''
+    if deltas.shape[0] > 1:
+        totals = np.nansum(deltas, axis=1)
+        counts = (~np.isnan(deltas)).sum(axis=1).astype(float)
+    else:
+        totals = batch_means(deltas, batch_size) * batch_size
+        counts = np.full(len(totals), float(batch_size))
+    mean = np.nanmean(deltas)
+    if len(totals) < 2:
+        return Interval(mbb(mean), np.nan, np.nan)
+    rng = np.random.default_rng(seed)
+    equal_counts = (counts == counts[0]).all()
+    estimates = np.empty(resamples)
+    # draw the resamples in blocks so the index array stays small
+    block = max(1, MAX_RESAMPLE_CELLS // len(totals))
+    for start in range(0, resamples, block):
+        indices = rng.integers(0, len(totals), size=(min(block, resamples - start), len(totals)), dtype=np.int32)
+        if equal_counts:
+            estimates[start:start + len(indices)] = totals[indices].mean(axis=1) / counts[0]
+        else:
+            estimates[start:start + len(indices)] = totals[indices].sum(axis=1) / counts[indices].sum(axis=1)
+    low, high = np.percentile(estimates, [50 - confidence * 50, 50 + confidence * 50])
+    return Interval(mbb(mean), mbb(low), mbb(high))
+
+
+def per_seat(deltas, small_blind, batch_size=100, confidence=0.95):
+    '''
+    Returns the batch-means win rate intervals of the small blind and big blind rounds.
+    '''
+    return [batch_means_interval(deltas, batch_size, confidence, mask) for mask in (small_blind, ~small_blind)]
+
+
+def summarize(name, opponent, deltas, small_blind, batch_size=100, resamples=2000):
+    '''
+    Prints the win rate of one bot against one opponent.
+    '''
+    totals = np.nansum(deltas, axis=1)
+    num_rounds = int((~np.isnan(deltas)).sum())
+    print('{} vs {}: {} matches, {} rounds, {} won, {} lost, {:+.0f} chips'.format(
+        name, opponent, deltas.shape[0], num_rounds, int((totals > 0).sum()), int((totals < 0).sum()), totals.sum()))
+    rows = [('win rate, batch means', batch_means_interval(deltas, batch_size)),
+            ('win rate, bootstrap', bootstrap_interval(deltas, resamples, batch_size))]
+    rows += zip(('small blind', 'big blind'), per_seat(deltas, small_blind, batch_size))
+    for label, interval in rows:
+        print('  {:<22} {:+9.1f} mbb/hand   95% CI [{:+9.1f}, {:+9.1f}]'.format(label, *interval))
+
+
+def parse_args():
+    '''
+    Parses the command line of the statistics report.
+    '''
+    parser = argparse.ArgumentParser(prog='python stats.py')
+    parser.add_argument('name', type=str, help='Bot to report on')
+    parser.add_argument('logs', nargs='+', help='Game logs of its matches')
+    parser.add_argument('--batch-size', type=int, default=100, help='Rounds per batch, defaults to 100')
+    parser.add_argument('--resamples', type=int, default=2000, help='Bootstrap resamples, defaults to 2000')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    for opponent, (deltas, small_blind) in sorted(from_logs(args.logs, args.name).items()):
+        summarize(args.name, opponent, deltas, small_blind, args.batch_size, args.resamples)
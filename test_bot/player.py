@@ -6,23 +6,22 @@ from skeleton.states import GameState, TerminalState, RoundState
 from skeleton.states import NUM_ROUNDS, STARTING_STACK, BIG_BLIND, SMALL_BLIND
 from skeleton.bot import Bot
 from skeleton.runner import parse_args, run_bot
-import eval7
+from skeleton.strength import eval7_percentile
+from skeleton.preflop import preflop_percentile
 import random
 
 def evaluate_hand(cards):
     '''
-    Evaluates the strength of a poker hand using eval7.
+    Evaluates the strength of a poker hand as its percentile among all hands of as many
+    cards, see skeleton/strength.py.
     
     Arguments:
-    cards: List of card strings (e.g., ['As', 'Ks', 'Qs', 'Js', '10s'])
+    cards: List of 3, 5 or 7 eval7.Cards (e.g., round_state.eval7_hands[active] + round_state.eval7_board)
     
     Returns:
-    float: Hand strength score (higher is better)
+    float: Hand strength from 0 to 1 (higher is better)
     '''
-    # Convert card strings to eval7 Card objects
-    eval7_cards = [eval7.Card(card) for card in cards]
-    # Evaluate the hand
-    return eval7.evaluate(eval7_cards)
+    return eval7_percentile(cards)
 
 class Player(Bot):
     '''
@@ -112,9 +111,11 @@ class Player(Bot):
         if game_state.bankroll > 0 and game_state.bankroll > ((remaining_rounds+1) * 6):
             return FoldAction()
 
-        # Evaluate current hand strength
-        current_hand = my_cards + board_cards
-        hand_strength = evaluate_hand(current_hand)
+        # Evaluate current hand strength, preflop as the share of starting hands we beat
+        if street == 0:
+            hand_strength = preflop_percentile(my_cards)
+        else:
+            hand_strength = evaluate_hand(round_state.eval7_hands[active] + round_state.eval7_board)
         
         # Adjust betting strategy based on hand strength
         if RaiseAction in legal_actions:
@@ -50,3 +50,16 @@ class Bot():
         Your action.
         '''
         raise NotImplementedError('get_action')
+
+    def handle_game_over(self):
+        '''
+        Called once when the match ends or the engine closes the connection, including matches
+        cut short. Overriding it is optional.
+
+        Arguments:
+        Nothing.
+
+        Returns:
+        Nothing.
+        '''
+        pass
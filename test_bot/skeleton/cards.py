@@ -0,0 +1,46 @@
+'''
+Interned card representations.
+
+The engine sends cards as strings such as 'Ah'. Every card also has an integer code,
+rank * 4 + suit with ranks 2..A as 0..12 and suits c, d, h, s as 0..3, a bit 1 << code in a
+52-bit card mask, and one shared eval7.Card, so that bots never parse a card string twice.
+RoundState exposes the eval7 cards of its hands and board.
+'''
+import eval7
+
+RANKS = '23456789TJQKA'
+SUITS = 'cdhs'
+NAMES = [rank + suit for rank in RANKS for suit in SUITS]
+CODES = {name: code for code, name in enumerate(NAMES)}
+EVAL7_CARDS = {name: eval7.Card(name) for name in NAMES}
+BITS = {name: 1 << code for name, code in CODES.items()}
+ALL_CARDS = (1 << len(NAMES)) - 1
+
+
+def eval7_cards(cards):
+    '''
+    Returns the shared eval7.Cards of a list of card strings.
+    '''
+    return [EVAL7_CARDS[card] for card in cards]
+
+
+def card_mask(cards):
+    '''
+    Returns the mask of a list of card strings.
+    '''
+    mask = 0
+    for card in cards:
+        mask |= BITS[card]
+    return mask
+
+
+def mask_codes(mask):
+    '''
+    Returns the codes of the cards in a mask, in increasing order.
+    '''
+    codes = []
+    while mask:
+        low = mask & -mask
+        codes.append(low.bit_length() - 1)
+        mask ^= low
+    return codes
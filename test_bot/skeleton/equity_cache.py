@@ -0,0 +1,153 @@
+'''
+Equity cache keyed by suit-isomorphic situation.
+
+Many (hole cards, board) situations repeat over a match up to a permutation of suits, and a bot
+may ask for the same equity several times on one street. EquityCache keys equities by street
+and canonical index (see isomorphism.py) and keeps the most recently used ones in memory.
+
+The cache can be saved to a file of sorted keys and equities, which a later match opens as a
+read-only memory map and searches by bisection, so the bot starts warm without reading the
+whole file into memory.
+'''
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+import mmap
+import os
+import struct
+import tempfile
+
+from .equity import estimate_equity, DEFAULT_TIME_BUDGET
+from .isomorphism import canonical_index
+
+DEFAULT_CAPACITY = 200000
+# 12 bytes per saved equity keeps a full file within the submission size limit
+DEFAULT_MAX_SAVED = 500000
+MAGIC = b'B4GEQ1'
+HEADER = struct.Struct('=6sxxQ')
+STREETS = (0, 2, 4)
+
+
+class EquityCache():
+    '''
+    A bounded least-recently-used cache of equities, optionally backed by a saved file.
+    '''
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, filename=None):
+        self.capacity = capacity
+        self.filename = filename
+        self.entries = OrderedDict()
+        self.hits = {street: 0 for street in STREETS}
+        self.file_hits = {street: 0 for street in STREETS}
+        self.misses = {street: 0 for street in STREETS}
+        self.saved_keys = ()
+        self.saved_equities = ()
+        self.mapping = None
+        if filename is not None and os.path.exists(filename):
+            self.open(filename)
+
+    def open(self, filename):
+        '''
+        Memory-maps a saved cache file. A file from another machine or version is ignored.
+        '''
+        with open(filename, 'rb') as cache_file:
+            if os.path.getsize(filename) < HEADER.size:
+                return
+            mapping = mmap.mmap(cache_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count = HEADER.unpack_from(mapping)
+        if magic != MAGIC or len(mapping) != HEADER.size + 12 * count:
+            mapping.close()
+            return
+        self.mapping = mapping
+        view = memoryview(mapping)
+        self.saved_keys = view[HEADER.size:HEADER.size + 8 * count].cast('Q')
+        self.saved_equities = view[HEADER.size + 8 * count:].cast('f')
+
+    @staticmethod
+    def key(my_cards, board_cards):
+        '''
+        Returns the cache key of a situation: its canonical index and street.
+        '''
+        return canonical_index(my_cards, board_cards) * 8 + len(board_cards)
+
+    def lookup(self, key):
+        '''
+        Returns the cached equity of a key, or None.
+        '''
+        street = key % 8
+        equity = self.entries.get(key)
+        if equity is not None:
+            self.entries.move_to_end(key)
+            self.hits[street] += 1
+            return equity
+        position = bisect_left(self.saved_keys, key)
+        if position < len(self.saved_keys) and self.saved_keys[position] == key:
+            self.file_hits[street] += 1
+            equity = self.saved_equities[position]
+            self.store(key, equity)
+            return equity
+        self.misses[street] += 1
+        return None
+
+    def store(self, key, equity):
+        '''
+        Caches an equity, evicting the least recently used one when full.
+        '''
+        self.entries[key] = equity
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    def equity(self, my_cards, board_cards, time_budget=DEFAULT_TIME_BUDGET, estimate=estimate_equity):
+        '''
+        Returns the cached equity of a situation, computing it on a miss with estimate, a
+        function of the cards and time budget such as estimate_equity.
+        '''
+        key = self.key(my_cards, board_cards)
+        equity = self.lookup(key)
+        if equity is None:
+            equity = estimate(my_cards, board_cards, time_budget)
+            self.store(key, equity)
+        return equity
+
+    def hit_rate(self, street=None):
+        '''
+        Returns the fraction of lookups answered from memory or the saved file.
+        '''
+        streets = STREETS if street is None else (street,)
+        hits = sum(self.hits[s] + self.file_hits[s] for s in streets)
+        total = hits + sum(self.misses[s] for s in streets)
+        return hits / total if total else 0.
+
+    def summary(self):
+        '''
+        Returns a one-line description of the cache's use.
+        '''
+        parts = ['street {}: {} memory hits, {} file hits, {} misses'.format(
+                 street, self.hits[street], self.file_hits[street], self.misses[street]) for street in STREETS]
+        return 'Equity cache hit rate {:.1%} ({}), {} cached'.format(self.hit_rate(), '; '.join(parts),
+                                                                  len(self.entries))
+
+    def save(self, filename=None, max_saved=DEFAULT_MAX_SAVED):
+        '''
+        Writes the saved and in-memory equities, at most max_saved of them, preferring the most
+        recently used, to a file that replaces the old one atomically. Concurrent saves do not
+        interfere; the last one wins.
+        '''
+        filename = filename or self.filename
+        merged = dict(zip(self.saved_keys, self.saved_equities))
+        for key, equity in self.entries.items():
+            merged.pop(key, None)
+            merged[key] = equity  # moved behind the older saved equities
+        kept = sorted(list(merged.items())[-max_saved:])
+        # a hidden temporary file of our own, as other matches of the bot may be saving too
+        directory, name = os.path.split(os.path.abspath(filename))
+        with tempfile.NamedTemporaryFile(dir=directory, prefix='.' + name + '.', delete=False) as cache_file:
+            try:
+                cache_file.write(HEADER.pack(MAGIC, len(kept)))
+                array('Q', [key for key, _ in kept]).tofile(cache_file)
+                array('f', [equity for _, equity in kept]).tofile(cache_file)
+            except BaseException:
+                os.remove(cache_file.name)
+                raise
+        os.replace(cache_file.name, filename)
@@ -0,0 +1,248 @@
+'''
+Suit-isomorphic indexing of B4G Hold'em hands.
+
+Hands that differ only by a permutation of suits, or by the order of the cards within the hole
+cards or within the board, play identically. A HandIndexer maps every such class to a dense
+integer in range(indexer.size) and back, so tables, caches and abstraction buckets can be plain
+arrays indexed by it. The indexers for the three streets are
+
+    PREFLOP  3 hole cards                           1,755 classes
+    FLOP     3 hole cards + 2 board cards       1,286,792 classes
+    TURN     3 hole cards + 4 board cards     204,461,673 classes
+
+The index is built as in Waugh, "A Fast and Optimal Hand Isomorphism Algorithm" (2013): every
+suit is described by the ranks it holds in each group of cards, suits are sorted by that
+description, and the sorted descriptions are ranked as a multiset.
+
+Cards are card strings such as 'Ah', or codes rank * 4 + suit with ranks 2..A as 0..12 and
+suits c, d, h, s as 0..3.
+'''
+from bisect import bisect_right
+from itertools import product
+from math import comb
+
+from .cards import CODES, NAMES
+
+NUM_RANKS = 13
+NUM_SUITS = 4
+
+
+def card_code(card):
+    '''
+    Returns the integer code of a card string, or the code itself.
+    '''
+    return card if isinstance(card, int) else CODES[card]
+
+
+def _colex_rank(positions):
+    '''
+    Returns the colexicographic rank of a sorted list of distinct positions.
+    '''
+    return sum(comb(position, i + 1) for i, position in enumerate(positions))
+
+
+# colex rank of the set bits of every 13-bit mask
+COLEX = [_colex_rank([bit for bit in range(NUM_RANKS) if mask >> bit & 1]) for mask in range(1 << NUM_RANKS)]
+POPCOUNT = [bin(mask).count('1') for mask in range(1 << NUM_RANKS)]
+
+
+def _compress(mask, used):
+    '''
+    Removes the bits set in used from mask, shifting the higher bits down to close the gaps.
+    '''
+    while used:
+        bit = used.bit_length() - 1
+        mask = (mask & ((1 << bit) - 1)) | ((mask >> (bit + 1)) << bit)
+        used ^= 1 << bit
+    return mask
+
+
+def _colex_unrank(rank, size):
+    '''
+    Returns the sorted positions of the subset of the given size with the given colex rank.
+    '''
+    positions = []
+    for k in range(size, 0, -1):
+        position = k - 1
+        while comb(position + 1, k) <= rank:
+            position += 1
+        rank -= comb(position, k)
+        positions.append(position)
+    return positions[::-1]
+
+
+def _multiset_rank(indices):
+    '''
+    Returns the rank of a multiset of non-negative integers, given sorted in descending order.
+    '''
+    k = len(indices)
+    return sum(comb(index + k - 1 - t, k - t) for t, index in enumerate(indices))
+
+
+def _multiset_unrank(rank, k):
+    '''
+    Returns the multiset of k integers with the given rank, in descending order.
+    '''
+    indices = []
+    for t in range(k):
+        r = k - t
+        b = r - 1
+        while comb(b + 1, r) <= rank:
+            b += 1
+        rank -= comb(b, r)
+        indices.append(b - (k - 1 - t))
+    return indices
+
+
+class HandIndexer():
+    '''
+    Ranks and unranks the suit-isomorphism classes of hands dealt in groups of cards, such as
+    (3,) for hole cards alone or (3, 4) for hole cards and a 4-card board.
+    '''
+
+    def __init__(self, groups):
+        self.groups = tuple(groups)
+        # every per-suit count vector and its number of rank configurations
+        self.configurations = {}
+        for counts in product(*(range(min(size, NUM_RANKS) + 1) for size in self.groups)):
+            if sum(counts) <= NUM_RANKS:
+                self.configurations[counts] = self._configuration_count(counts)
+        # every shape, a descending tuple of the four suits' count vectors, with its offset
+        self.shapes = []
+        self.offsets = []
+        self.radices = []
+        size = 0
+        for shape in self._shapes():
+            self.shapes.append(shape)
+            self.offsets.append(size)
+            radices = [comb(self.configurations[counts] + k - 1, k) for counts, k in self._runs(shape)]
+            self.radices.append(radices)
+            total = 1
+            for radix in radices:
+                total *= radix
+            size += total
+        self.shape_offsets = {shape: offset for shape, offset in zip(self.shapes, self.offsets)}
+        self.shape_radices = {shape: radices for shape, radices in zip(self.shapes, self.radices)}
+        self.size = size
+
+    def _configuration_count(self, counts):
+        '''
+        Returns how many ways one suit can hold the given number of cards in each group.
+        '''
+        total = 1
+        remaining = NUM_RANKS
+        for count in counts:
+            total *= comb(remaining, count)
+            remaining -= count
+        return total
+
+    def _shapes(self):
+        '''
+        Yields the possible shapes in a fixed order.
+        '''
+        per_group = []
+        for size in self.groups:
+            per_group.append([split for split in product(range(size + 1), repeat=NUM_SUITS) if sum(split) == size])
+        shapes = set()
+        for splits in product(*per_group):
+            suits = [tuple(split[suit] for split in splits) for suit in range(NUM_SUITS)]
+            if all(counts in self.configurations for counts in suits):
+                shapes.add(tuple(sorted(suits, reverse=True)))
+        return sorted(shapes)
+
+    @staticmethod
+    def _runs(shape):
+        '''
+        Returns (count vector, number of suits) for each run of equal count vectors of a shape.
+        '''
+        runs = []
+        for counts in shape:
+            if runs and runs[-1][0] == counts:
+                runs[-1][1] += 1
+            else:
+                runs.append([counts, 1])
+        return runs
+
+    def _suit_rank(self, masks):
+        '''
+        Returns the index of one suit's configuration, given the rank mask of each group, among
+        the configurations with the same count vector.
+        '''
+        index = COLEX[masks[0]]
+        multiplier = 1
+        used = masks[0]
+        remaining = NUM_RANKS
+        for previous, mask in zip(masks, masks[1:]):
+            multiplier *= comb(remaining, POPCOUNT[previous])
+            remaining -= POPCOUNT[previous]
+            # rank this group among the ranks unused by earlier groups
+            index += multiplier * COLEX[_compress(mask, used)]
+            used |= mask
+        return index
+
+    def _suit_unrank(self, index, counts):
+        '''
+        Returns one suit's sorted ranks per group from its configuration index.
+        '''
+        rank_sets = []
+        free = list(range(NUM_RANKS))
+        for count in counts:
+            radix = comb(len(free), count)
+            positions = _colex_unrank(index % radix, count)
+            index //= radix
+            ranks = [free[position] for position in positions]
+            rank_sets.append(ranks)
+            free = [rank for rank in free if rank not in ranks]
+        return rank_sets
+
+    def index(self, *groups):
+        '''
+        Returns the class index of a hand, given one list of cards per group.
+        '''
+        masks = [[0] * len(self.groups) for _ in range(NUM_SUITS)]
+        for group, cards in enumerate(groups):
+            for card in cards:
+                code = card if isinstance(card, int) else CODES[card]
+                masks[code & 3][group] |= 1 << (code >> 2)
+        described = [(tuple(POPCOUNT[mask] for mask in suit_masks), self._suit_rank(suit_masks))
+                     for suit_masks in masks]
+        described.sort(reverse=True)
+        shape = tuple(counts for counts, _ in described)
+        index = 0
+        multiplier = 1
+        start = 0
+        for (counts, k), radix in zip(self._runs(shape), self.shape_radices[shape]):
+            index += multiplier * _multiset_rank([suit_index for _, suit_index in described[start:start + k]])
+            multiplier *= radix
+            start += k
+        return self.shape_offsets[shape] + index
+
+    def unindex(self, index):
+        '''
+        Returns a representative hand of a class as one list of card strings per group.
+        '''
+        position = bisect_right(self.offsets, index) - 1
+        shape = self.shapes[position]
+        index -= self.offsets[position]
+        groups = [[] for _ in self.groups]
+        suit = 0
+        for (counts, k), radix in zip(self._runs(shape), self.radices[position]):
+            for suit_index in _multiset_unrank(index % radix, k):
+                for group, ranks in enumerate(self._suit_unrank(suit_index, counts)):
+                    groups[group].extend(NAMES[4 * rank + suit] for rank in ranks)
+                suit += 1
+            index //= radix
+        return groups
+
+
+PREFLOP = HandIndexer((3,))
+FLOP = HandIndexer((3, 2))
+TURN = HandIndexer((3, 4))
+INDEXERS = {0: PREFLOP, 2: FLOP, 4: TURN}
+
+
+def canonical_index(my_cards, board_cards):
+    '''
+    Returns the class index of hole cards and board for the street given by the board's size.
+    '''
+    return INDEXERS[len(board_cards)].index(my_cards, board_cards)
@@ -0,0 +1,92 @@
+'''
+Exact final-street equity from a sorted table of opponent holdings.
+
+Once the 4-card board is complete it stays fixed for every remaining decision of the round. A
+RiverTable ranks all C(48, 3) = 17,296 holdings of the cards off the board in one batch with
+fasteval.py and sorts them by value, keeping each holding's card mask. Our equity against the
+holdings that share no card with our hand, or against any weighted range of them, is then a
+binary search for our value plus a masked count. Tables of recent boards are cached.
+'''
+from functools import lru_cache
+from itertools import combinations
+
+import eval7
+import numpy as np
+
+from .cards import EVAL7_CARDS, NAMES, card_mask
+from .fasteval import evaluate, hand_mask, hand_masks
+
+HOLE_SIZE = 3
+# boards whose tables are kept; a round only ever needs its own
+CACHED_BOARDS = 2
+
+# every 3-card holding, its fasteval mask and its cards as bits 1 << code
+HOLDINGS = np.array(list(combinations(range(len(NAMES)), HOLE_SIZE)), dtype=np.int8)
+HOLDING_MASKS = hand_masks(HOLDINGS)
+HOLDING_BITS = np.bitwise_or.reduce(np.uint64(1) << HOLDINGS.astype(np.uint64), axis=1)
+
+
+class RiverTable():
+    '''
+    All opponent holdings on one complete board, sorted by eval7 value.
+    '''
+
+    def __init__(self, board_cards):
+        self.board_cards = list(board_cards)
+        self.board = [EVAL7_CARDS[card] for card in board_cards]
+        off_board = np.flatnonzero((HOLDING_BITS & np.uint64(card_mask(board_cards))) == 0)
+        values = evaluate(HOLDING_MASKS[off_board] | np.uint64(hand_mask(board_cards)))
+        order = np.argsort(values, kind='stable')
+        self.values = values[order]
+        order = off_board[order]
+        self.holdings = HOLDINGS[order]
+        # the holdings' cards, to remove those that share a card with ours
+        self.masks = HOLDING_BITS[order]
+
+    def value(self, my_cards):
+        '''
+        Returns the eval7 value of our hand on this board.
+        '''
+        return eval7.evaluate([EVAL7_CARDS[card] for card in my_cards] + self.board)
+
+    def available(self, my_cards):
+        '''
+        Returns a boolean array, in table order, of the holdings that share no card with ours.
+        '''
+        return (self.masks & np.uint64(card_mask(my_cards))) == 0
+
+    def equity(self, my_cards, weights=None):
+        '''
+        Returns our equity, ties counting half, against every holding that shares no card with
+        our hand, or against a range given as weights over the holdings in table order.
+        '''
+        value = self.value(my_cards)
+        below = np.searchsorted(self.values, value, side='left')
+        above = np.searchsorted(self.values, value, side='right')
+        if weights is None:
+            weights = self.available(my_cards)
+        else:
+            weights = np.where(self.available(my_cards), weights, 0.)
+        total = weights.sum()
+        if total == 0:
+            return 0.5
+        return float((weights[:below].sum() + 0.5 * weights[below:above].sum()) / total)
+
+
+@lru_cache(maxsize=CACHED_BOARDS)
+def _river_table(board):
+    return RiverTable(board)
+
+
+def river_table(board_cards):
+    '''
+    Returns the RiverTable of a complete board, building it on the board's first use.
+    '''
+    return _river_table(tuple(sorted(board_cards)))
+
+
+def river_equity(my_cards, board_cards, weights=None):
+    '''
+    Returns our exact equity on a complete board, see RiverTable.equity.
+    '''
+    return river_table(board_cards).equity(my_cards, weights)
@@ -1,57 +1,72 @@
-import subprocess
+import json
 import os
 import time
 from pathlib import Path
 
-def run_game():
+import engine
+
+SERIES_DIRECTORY = 'series_logs'
+SERIES_RESULTS = os.path.join(SERIES_DIRECTORY, 'results.json')
+
+def run_game(game_num, resume=False):
     """
-    Runs a single game and returns the winner from the gamelog.
+    Runs a single game and returns the winner from its final bankrolls.
+    Args:
+        game_num: Index of the game, which names its log directory
+        resume: Whether to continue the game from its last checkpoint
     Returns:
         int: 0 for player 0 win, 1 for player 1 win, -1 for error
     """
     try:
-        # Run the engine
-        subprocess.run(['python', 'engine.py'], check=True)
-        
-        # Read the last line of gamelog.txt
-        with open('gamelog.txt', 'r') as f:
-            lines = f.readlines()
-            if not lines:
-                return -1
-                
-            last_line = lines[-1].strip()
-            
-            # Parse the winner from the last line
-            if "Player 0 wins" in last_line:
-                return 0
-            elif "Player 1 wins" in last_line:
-                return 1
-            else:
-                print(f"Unexpected last line: {last_line}")
-                return -1
-                
+        log_filename = os.path.join(SERIES_DIRECTORY, f"game{game_num}", 'gamelog')
+        result = engine.play_match((engine.PLAYER_1_NAME, engine.PLAYER_1_PATH),
+                                   (engine.PLAYER_2_NAME, engine.PLAYER_2_PATH),
+                                   log_filename, quiet=False, resume=resume)
     except Exception as e:
         print(f"Error running game: {e}")
         return -1
 
-def run_test_series(num_games=100):
+    if result.bankrolls[0] > result.bankrolls[1]:
+        return 0
+    elif result.bankrolls[0] < result.bankrolls[1]:
+        return 1
+    print(f"Tied game: {result.bankrolls}")
+    return -1
+
+def run_test_series(num_games=100, resume=False):
     """
     Runs multiple games and tracks win rates.
+
+    Finished games are recorded in SERIES_RESULTS, so with resume=True a crashed series
+    skips them and continues the interrupted game from its checkpoint.
     
     Args:
         num_games: Number of games to run
+        resume: Whether to continue a crashed series
     """
     # Initialize counters
     player0_wins = 0
     player1_wins = 0
     errors = 0
+    results = {}
+    os.makedirs(SERIES_DIRECTORY, exist_ok=True)
+    if resume and os.path.exists(SERIES_RESULTS):
+        with open(SERIES_RESULTS, 'r') as f:
+            results = json.load(f)
     
     print(f"Starting test series of {num_games} games...")
     
     # Run games
     for i in range(num_games):
-        print(f"\nRunning game {i+1}/{num_games}")
-        winner = run_game()
+        if str(i) in results:
+            winner = results[str(i)]
+            print(f"\nGame {i+1}/{num_games} already played")
+        else:
+            print(f"\nRunning game {i+1}/{num_games}")
+            winner = run_game(i, resume)
+            results[str(i)] = winner
+            with open(SERIES_RESULTS, 'w') as f:
+                json.dump(results, f)
         
         if winner == 0:
             player0_wins += 1
@@ -84,11 +99,13 @@ def run_test_series(num_games=100):
 if __name__ == "__main__":
     # Get the number of games from command line or use default
     import sys
-    num_games = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    args = [arg for arg in sys.argv[1:] if arg != '--resume']
+    num_games = int(args[0]) if args else 100
+    resume = '--resume' in sys.argv[1:]
     
     # Ensure we're in the correct directory
     script_dir = Path(__file__).parent
     os.chdir(script_dir)
     
     # Run the test series
-    run_test_series(num_games) 
\ No newline at end of file
+    run_test_series(num_games, resume) 
\ No newline at end of file
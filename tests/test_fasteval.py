@@ -0,0 +1,13 @@
+'''
+Checks the batched evaluator in the skeleton against eval7. Run with `python -m pytest tests`.
+'''
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'python_skeleton'))
+
+from skeleton import fasteval
+
+
+def test_evaluate_matches_eval7():
+    assert fasteval.verify() is True
@@ -0,0 +1,225 @@
+'''
+Parallel parameter tuner for pokerbots, using successive halving with racing.
+
+The tuner copies a bot directory once per candidate configuration, writing the configuration
+to the copy's params.json (see skeleton/params.py), and plays every candidate against a fixed
+opponent on a process pool. Play proceeds in rungs: each rung plays more matches for every
+surviving candidate, then drops the candidates whose win rate confidence interval lies entirely
+below the leader's (racing) and keeps only the best 1/eta of the rest (successive halving).
+Match k of every candidate uses the same seed and seating, so candidates are compared on the
+same cards.
+
+The space file is JSON:
+    {
+        "bot": "./luckson",
+        "opponent": "./equity",
+        "parameters": {
+            "bluff_probability": [0.0, 0.1, 0.2, 0.3],
+            "strong_equity": {"low": 0.5, "high": 0.8}
+        }
+    }
+Lists are choices, {"low", "high"} ranges are sampled uniformly. Candidates are the full grid
+when every parameter is a list and --configs is not given, otherwise --configs random samples.
+
+Example:
+    python tuner.py space.json --configs 16 --rounds 1000 --matches 2
+'''
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+import argparse
+import json
+import math
+import os
+import random
+import shutil
+
+import engine
+import stats
+
+TUNER_DIRECTORY = 'tuner_runs'
+
+
+def candidates(parameters, num_configs, rng):
+    '''
+    Returns the parameter dicts to try.
+    '''
+    names = sorted(parameters)
+    if num_configs is None and all(isinstance(parameters[name], list) for name in names):
+        return [dict(zip(names, values)) for values in product(*(parameters[name] for name in names))]
+    configs = []
+    for _ in range(num_configs or 16):
+        config = {}
+        for name in names:
+            space = parameters[name]
+            if isinstance(space, list):
+                config[name] = rng.choice(space)
+            else:
+                config[name] = round(rng.uniform(space['low'], space['high']), 4)
+        configs.append(config)
+    return configs
+
+
+class Candidate():
+    '''
+    One configuration of the tuned bot and the per-round deltas of its matches so far.
+    '''
+
+    def __init__(self, index, params, path):
+        self.index = index
+        self.name = 'variant-{}'.format(index)
+        self.params = params
+        self.path = path
+        self.results = []
+        self.dropped = None
+
+    def interval(self, batch_size):
+        '''
+        Returns the batch-means stats.Interval of the candidate's win rate in mbb/hand.
+        '''
+        deltas, _ = stats.from_results(self.results, self.name)
+        return stats.batch_means_interval(deltas, batch_size)
+
+
+class Tuner():
+    '''
+    Runs successive halving over the candidate configurations of one bot.
+    '''
+
+    def __init__(self, space, num_configs=None, num_rounds=1000, matches=2, eta=2, seed=None,
+                 directory=TUNER_DIRECTORY, batch_size=100):
+        if eta < 2:
+            raise ValueError('eta must be at least 2, or the candidates never thin out')
+        self.bot = os.path.abspath(space['bot'])
+        self.opponent = (os.path.basename(os.path.normpath(space['opponent'])), os.path.abspath(space['opponent']))
+        self.seed = seed if seed is not None else random.randrange(2**32)
+        self.num_rounds = num_rounds
+        self.matches = matches
+        self.eta = eta
+        self.directory = directory
+        self.batch_size = batch_size
+        rng = random.Random(self.seed)
+        self.candidates = [Candidate(index, params, os.path.join(os.path.abspath(directory), 'variant-{}'.format(index)))
+                           for index, params in enumerate(candidates(space['parameters'], num_configs, rng))]
+
+    def create_variants(self):
+        '''
+        Copies the tuned bot once per candidate and writes each candidate's params.json.
+        '''
+        for candidate in self.candidates:
+            if os.path.exists(candidate.path):
+                shutil.rmtree(candidate.path)
+            shutil.copytree(self.bot, candidate.path, ignore=shutil.ignore_patterns('__pycache__', '*.pyc', '.*'))
+            with open(os.path.join(candidate.path, 'params.json'), 'w') as params_file:
+                json.dump(candidate.params, params_file, indent=1)
+
+    def match_spec(self, candidate, match):
+        '''
+        Returns the play_match arguments of one match, alternating seats and sharing the seed of
+        match number match across candidates.
+        '''
+        players = [(candidate.name, candidate.path), self.opponent]
+        if match % 2 == 1:
+            players = players[::-1]
+        log_filename = os.path.join(self.directory, 'logs', '{}-m{}'.format(candidate.name, match + 1), 'gamelog')
+        overrides = {'NUM_ROUNDS': self.num_rounds, 'USE_ZYGOTES': True,
+                     'MATCH_SEED': random.Random('{}-{}'.format(self.seed, match)).randrange(2**32)}
+        return players[0], players[1], log_filename, overrides
+
+    def play_rung(self, executor, survivors, num_matches):
+        '''
+        Plays matches until every survivor has num_matches of them.
+        '''
+        futures = []
+        for candidate in survivors:
+            for match in range(len(candidate.results), num_matches):
+                futures.append((candidate, executor.submit(engine.play_match, *self.match_spec(candidate, match))))
+        for candidate, future in futures:
+            candidate.results.append(future.result())
+
+    def prune(self, survivors, rung):
+        '''
+        Returns the survivors that stay in the race after a rung, best first.
+        '''
+        intervals = {candidate: candidate.interval(self.batch_size) for candidate in survivors}
+        ranked = sorted(survivors, key=lambda candidate: -intervals[candidate].mean)
+        leader = intervals[ranked[0]]
+        keep = max(1, math.ceil(len(ranked) / self.eta))
+        kept = []
+        for candidate in ranked:
+            interval = intervals[candidate]
+            if candidate is not ranked[0] and interval.high < leader.low:
+                candidate.dropped = rung  # clearly worse than the leader
+            elif len(kept) == keep:
+                candidate.dropped = rung
+            else:
+                kept.append(candidate)
+        print('Rung {}: {} matches of {} rounds each, {} of {} candidates stay'.format(
+            rung + 1, len(ranked[0].results), self.num_rounds, len(kept), len(ranked)))
+        for candidate in ranked:
+            interval = intervals[candidate]
+            print('  {:<12} {:+9.1f} mbb/hand [{:+9.1f}, {:+9.1f}] {}{}'.format(
+                candidate.name, interval.mean, interval.low, interval.high,
+                json.dumps(candidate.params), '' if candidate in kept else '  dropped'))
+        return kept
+
+    def run(self, workers=None):
+        '''
+        Races the candidates until one is left and returns it.
+        '''
+        self.create_variants()
+        print('Tuning', len(self.candidates), 'configurations of', self.bot, 'against', self.opponent[1])
+        survivors = list(self.candidates)
+        num_matches = self.matches
+        rung = 0
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            while True:
+                self.play_rung(executor, survivors, num_matches)
+                survivors = self.prune(survivors, rung)
+                if len(survivors) == 1:
+                    break
+                num_matches *= self.eta
+                rung += 1
+        best = survivors[0]
+        print('Best:', best.name, json.dumps(best.params))
+        self.save(best)
+        return best
+
+    def save(self, best):
+        '''
+        Writes every candidate's parameters, matches played and win rate to results.json.
+        '''
+        results = []
+        for candidate in self.candidates:
+            interval = candidate.interval(self.batch_size)
+            results.append({'name': candidate.name, 'params': candidate.params, 'matches': len(candidate.results),
+                            'mbb_per_hand': interval.mean, 'low': interval.low, 'high': interval.high,
+                            'dropped_after_rung': None if candidate.dropped is None else candidate.dropped + 1})
+        with open(os.path.join(self.directory, 'results.json'), 'w') as results_file:
+            json.dump({'seed': self.seed, 'best': best.name, 'best_params': best.params, 'candidates': results},
+                      results_file, indent=2)
+
+
+def parse_args():
+    '''
+    Parses the tuner's command line.
+    '''
+    parser = argparse.ArgumentParser(prog='python tuner.py')
+    parser.add_argument('space', type=str, help='JSON file with the bot, opponent and parameter space')
+    parser.add_argument('--configs', type=int, default=None, help='Random configurations to sample')
+    parser.add_argument('--rounds', type=int, default=1000, help='Rounds per match, defaults to 1000')
+    parser.add_argument('--matches', type=int, default=2, help='Matches per candidate in the first rung, defaults to 2')
+    parser.add_argument('--eta', type=int, default=2, help='Keep 1/eta of the candidates per rung, defaults to 2')
+    parser.add_argument('--workers', type=int, default=None, help='Parallel matches, defaults to the CPU count')
+    parser.add_argument('--seed', type=int, default=None, help='Seed for sampling and match seeds')
+    parser.add_argument('--dir', type=str, default=TUNER_DIRECTORY, help='Where to put variants and logs')
+    args = parser.parse_args()
+    if args.eta < 2:
+        parser.error('--eta must be at least 2')
+    return args
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    with open(args.space, 'r') as space_file:
+        space = json.load(space_file)
+    Tuner(space, args.configs, args.rounds, args.matches, args.eta, args.seed, args.dir).run(args.workers)
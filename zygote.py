@@ -0,0 +1,316 @@
+'''
+Fork server ("zygote") for Python pokerbots.
+
+Starting a bot with `python player.py <port>` re-imports eval7, the skeleton and any lookup
+tables the bot loads at import time. A zygote imports a bot directory's player.py once and then
+forks a fresh copy for every match, which connects to the engine through the normal run_bot path.
+
+Run `python zygote.py <bot directory> [launches]` to compare launch-to-connect latency with the
+subprocess.Popen path used by the engine.
+'''
+import argparse
+import os
+import random
+import select
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import traceback
+
+PYTHON_COMMANDS = (['python', 'player.py'], ['python3', 'player.py'])
+
+
+def forkable(commands):
+    '''
+    Returns True if the commands.json run command just starts player.py with Python.
+    '''
+    return commands is not None and commands.get('run') in PYTHON_COMMANDS
+
+
+class ForkedBot():
+    '''
+    Stands in for the subprocess.Popen object of a pokerbot forked by a zygote.
+
+    The bot is a child of the zygote rather than of the engine. The zygote waits on it and
+    reports its exit status, which becomes returncode as for Popen: the exit code, or minus the
+    signal that killed it.
+    '''
+
+    def __init__(self, zygote, pid, stdout):
+        self.zygote = zygote
+        self.pid = pid
+        self.stdout = stdout
+        self.returncode = None
+
+    def poll(self):
+        '''
+        Returns the pokerbot's exit status once it has exited, otherwise None.
+        '''
+        if self.returncode is None:
+            self.returncode = self.zygote.exit_status(self.pid)
+        return self.returncode
+
+    def communicate(self, timeout=None):
+        '''
+        Waits for the pokerbot to exit. Its output is read by the engine's listening thread.
+        '''
+        if self.returncode is None:
+            self.returncode = self.zygote.exit_status(self.pid, timeout)
+            if self.returncode is None:
+                raise subprocess.TimeoutExpired('player.py', timeout)
+        return b'', None
+
+    def kill(self):
+        '''
+        Kills the pokerbot.
+        '''
+        try:
+            os.kill(self.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+
+class Zygote():
+    '''
+    Owns the fork server for one pokerbot directory.
+
+    The server replies to each launch request with a line 'pid <pid>' and reports every pokerbot
+    it reaps with a line 'exit <pid> <status>'. A thread reads these replies as they come.
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self.process = None
+        self.socket = None
+        self.condition = threading.Condition()
+        # pids of launches not yet returned by spawn, and exit statuses not yet collected
+        self.pids = []
+        self.statuses = {}
+        self.closed = True
+
+    def start(self):
+        '''
+        Starts the fork server, which imports player.py before accepting launch requests.
+        '''
+        control, remote = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+        with remote:
+            self.process = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--serve', str(remote.fileno())],
+                                            cwd=self.path, pass_fds=[remote.fileno()])
+        with self.condition:
+            self.socket = control
+            self.pids = []
+            self.closed = False
+        threading.Thread(target=self.read_replies, args=(control,), daemon=True).start()
+
+    def read_replies(self, control):
+        '''
+        Records the server's replies on the control socket until it is closed.
+        '''
+        for line in control.makefile('rb'):
+            kind, pid, *status = line.split()
+            with self.condition:
+                if kind == b'pid':
+                    self.pids.append(int(pid))
+                else:
+                    self.statuses[int(pid)] = int(status[0])
+                self.condition.notify_all()
+        with self.condition:
+            if self.socket is control:
+                self.closed = True
+            self.condition.notify_all()
+
+    def spawn(self, port, memory_limit=None):
+        '''
+        Forks a fresh pokerbot which connects to the engine on the given port.
+
+        Returns:
+            ForkedBot: A handle to the pokerbot, whose stdout carries the bot's output.
+        '''
+        if self.process is None or self.process.poll() is not None:
+            self.start()
+        read_fd, write_fd = os.pipe()
+        try:
+            request = '{} {}\n'.format(port, memory_limit or 0).encode()
+            socket.send_fds(self.socket, [request], [write_fd])
+        finally:
+            os.close(write_fd)
+        with self.condition:
+            self.condition.wait_for(lambda: self.pids or self.closed)
+            if not self.pids:
+                os.close(read_fd)
+                raise OSError('zygote for ' + self.path + ' exited')
+            pid = self.pids.pop(0)
+        return ForkedBot(self, pid, os.fdopen(read_fd, 'rb'))
+
+    def exit_status(self, pid, timeout=0):
+        '''
+        Returns the exit status of a pokerbot forked by this zygote, waiting up to timeout
+        seconds for it to exit (forever if None), or None if it is still running.
+        '''
+        with self.condition:
+            self.condition.wait_for(lambda: pid in self.statuses or self.closed, timeout)
+            if pid in self.statuses:
+                return self.statuses.pop(pid)
+            if not self.closed:
+                return None
+        # the fork server exited first and cannot report the status, so wait on the pid and
+        # count the exit as a failure
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        while True:
+            try:
+                os.kill(pid, 0)
+            except ProcessLookupError:
+                return 1
+            if deadline is not None and time.perf_counter() > deadline:
+                return None
+            time.sleep(0.01)
+
+    def stop(self):
+        '''
+        Shuts the fork server down. Pokerbots it has already forked keep running.
+        '''
+        if self.process is not None:
+            self.socket.shutdown(socket.SHUT_RDWR)
+            self.socket.close()
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+            self.process = None
+
+
+def run_forked_bot(player, port, memory_limit, output_fd):
+    '''
+    Body of a freshly forked pokerbot. Never returns.
+    '''
+    status = 0
+    try:
+        os.setsid()
+        os.dup2(output_fd, 1)
+        os.dup2(output_fd, 2)
+        os.close(output_fd)
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        # forked children would otherwise share the zygote's random state
+        random.seed()
+        if memory_limit:
+            import resource
+            resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+        from skeleton.runner import run_bot
+        run_bot(player.Player(), argparse.Namespace(host='localhost', port=port))
+    except BaseException:
+        traceback.print_exc()
+        status = 1
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(status)
+
+
+def report_exits(control):
+    '''
+    Reaps every pokerbot that has exited and reports its status, as a subprocess returncode,
+    on the control socket.
+    '''
+    while True:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            return
+        if pid == 0:
+            return
+        control.sendall('exit {} {}\n'.format(pid, os.waitstatus_to_exitcode(status)).encode())
+
+
+def serve(control_fd):
+    '''
+    Imports player.py from the working directory and forks a pokerbot per launch request.
+    '''
+    control = socket.socket(fileno=control_fd)
+    sys.path.insert(0, os.getcwd())
+    import player
+    # SIGCHLD writes to this pipe, waking the select below to report the pokerbot's exit
+    wakeup_read, wakeup_write = os.pipe()
+    os.set_blocking(wakeup_read, False)
+    os.set_blocking(wakeup_write, False)
+    signal.set_wakeup_fd(wakeup_write)
+    signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+    while True:
+        readable, _, _ = select.select([control, wakeup_read], [], [])
+        if wakeup_read in readable:
+            try:
+                while os.read(wakeup_read, 512):
+                    pass
+            except BlockingIOError:
+                pass
+        report_exits(control)
+        if control not in readable:
+            continue
+        message, fds, _, _ = socket.recv_fds(control, 1024, 1)
+        if not message:
+            return
+        port, memory_limit = map(int, message.split())
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid == 0:
+            signal.set_wakeup_fd(-1)
+            os.close(wakeup_read)
+            os.close(wakeup_write)
+            control.close()
+            run_forked_bot(player, port, memory_limit, fds[0])
+        os.close(fds[0])
+        control.sendall('pid {}\n'.format(pid).encode())
+
+
+def time_to_connect(launch):
+    '''
+    Returns the seconds between launching a pokerbot and its socket connection being accepted.
+    '''
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as server_socket:
+        server_socket.bind(('', 0))
+        server_socket.listen()
+        port = server_socket.getsockname()[1]
+        start_time = time.perf_counter()
+        proc = launch(port)
+        client_socket, _ = server_socket.accept()
+        end_time = time.perf_counter()
+        with client_socket:
+            client_socket.sendall(b'Q\n')
+        proc.communicate(timeout=10)
+        proc.stdout.close()
+    return end_time - start_time
+
+
+def benchmark(path, launches):
+    '''
+    Compares launch-to-connect latency of subprocess.Popen and zygote forks for one bot.
+    '''
+    def popen(port):
+        return subprocess.Popen(['python', 'player.py', str(port)], cwd=path,
+                                stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    zygote = Zygote(path)
+    zygote.start()
+    # the first launch waits for the zygote to import player.py
+    warm_up = zygote.spawn(0)
+    warm_up.communicate(timeout=10)
+    warm_up.stdout.close()
+    for name, launch in (('subprocess.Popen', popen), ('zygote fork', zygote.spawn)):
+        times = [time_to_connect(launch) * 1000 for _ in range(launches)]
+        print('{:<17} median {:7.1f} ms, mean {:7.1f} ms, max {:7.1f} ms over {} launches'.format(
+            name, statistics.median(times), statistics.mean(times), max(times), launches))
+    zygote.stop()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 3 and sys.argv[1] == '--serve':
+        serve(int(sys.argv[2]))
+    else:
+        parser = argparse.ArgumentParser(prog='python zygote.py')
+        parser.add_argument('path', type=str, help='Pokerbot directory to benchmark')
+        parser.add_argument('launches', type=int, nargs='?', default=20, help='Launches per method')
+        args = parser.parse_args()
+        benchmark(args.path, args.launches)